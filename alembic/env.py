@@ -35,6 +35,18 @@ if config.config_file_name is not None:
 
 target_metadata = Base.metadata
 
+# created by raw migrations (3b9c1d7e5a21, d71c4e9b2a58; postgres only) and deliberately not on the models;
+# without this, autogenerate proposes dropping them
+UNMAPPED_COLUMNS = {("jobs", "search_vector")}
+UNMAPPED_INDEXES = {"ix_jobs_search_vector", "ix_jobs_title_trgm", "ix_jobs_location_normalized_trgm", "ix_users_full_name_trgm"}
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "column" and (object.table.name, name) in UNMAPPED_COLUMNS:
+        return False
+    if type_ == "index" and name in UNMAPPED_INDEXES:
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -57,6 +69,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -80,7 +93,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
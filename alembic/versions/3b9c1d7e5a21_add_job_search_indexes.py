@@ -0,0 +1,47 @@
+"""add job search indexes
+
+Revision ID: 3b9c1d7e5a21
+Revises: f35c030a5803
+Create Date: 2026-10-18 09:12:40.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '3b9c1d7e5a21'
+down_revision: Union[str, None] = 'f35c030a5803'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # full-text search and trigram indexes are postgres only; sqlite falls back to LIKE scans
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("""
+        ALTER TABLE jobs ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(location, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'C')
+        ) STORED
+    """)
+    op.create_index("ix_jobs_search_vector", "jobs", ["search_vector"], postgresql_using="gin")
+    # trigram indexes let the existing ILIKE '%...%' filters use an index scan
+    op.create_index("ix_jobs_title_trgm", "jobs", ["title"], postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"})
+    op.create_index("ix_jobs_location_trgm", "jobs", ["location"], postgresql_using="gin", postgresql_ops={"location": "gin_trgm_ops"})
+    op.create_index("ix_users_full_name_trgm", "users", ["full_name"], postgresql_using="gin", postgresql_ops={"full_name": "gin_trgm_ops"})
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.drop_index("ix_users_full_name_trgm", table_name="users")
+    op.drop_index("ix_jobs_location_trgm", table_name="jobs")
+    op.drop_index("ix_jobs_title_trgm", table_name="jobs")
+    op.drop_index("ix_jobs_search_vector", table_name="jobs")
+    op.execute("ALTER TABLE jobs DROP COLUMN search_vector")
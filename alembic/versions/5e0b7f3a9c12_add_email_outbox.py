@@ -0,0 +1,49 @@
+"""add email outbox
+
+Revision ID: 5e0b7f3a9c12
+Revises: c27e9a4f1d58
+Create Date: 2026-10-18 15:21:08.933470
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '5e0b7f3a9c12'
+down_revision: Union[str, None] = 'c27e9a4f1d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+outbox_status = sa.Enum("pending", "sent", "failed", name="outboxstatus")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "email_outbox",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("to_email", sa.String(256), nullable=False),
+        sa.Column("subject", sa.String(500), nullable=False),
+        sa.Column("html_content", sa.Text(), nullable=False),
+        sa.Column("status", outbox_status, nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("last_error", sa.Text()),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("sent_at", sa.DateTime()),
+    )
+    op.create_index("ix_email_outbox_status", "email_outbox", ["status"])
+    # the worker's claim query: due pending rows, oldest first
+    op.create_index(
+        "ix_email_outbox_pending_due", "email_outbox", ["next_attempt_at"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_email_outbox_pending_due", table_name="email_outbox")
+    op.drop_index("ix_email_outbox_status", table_name="email_outbox")
+    op.drop_table("email_outbox")
+    outbox_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,38 @@
+"""add job status counts
+
+Revision ID: 7c3e5b1f2d90
+Revises: e6f1a9c3b784
+Create Date: 2026-10-18 17:25:49.681203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '7c3e5b1f2d90'
+down_revision: Union[str, None] = 'e6f1a9c3b784'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# the type already exists from the baseline; don't create it again
+application_status = postgresql.ENUM("Applied", "Reviewed", "Interview", "Rejected", "Hired", name="applicationstatus", create_type=False)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "job_status_counts",
+        sa.Column("job_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("status", application_status, primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.execute("""
+        INSERT INTO job_status_counts (job_id, status, count)
+        SELECT job_id, status, count(*) FROM applications WHERE status IS NOT NULL GROUP BY job_id, status
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("job_status_counts")
@@ -0,0 +1,29 @@
+"""add application resume status
+
+Revision ID: 8d41c2f0b6a3
+Revises: 3b9c1d7e5a21
+Create Date: 2026-10-18 11:02:17.540921
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '8d41c2f0b6a3'
+down_revision: Union[str, None] = '3b9c1d7e5a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+resume_status = sa.Enum("pending", "ready", "failed", name="resumestatus")
+
+
+def upgrade() -> None:
+    resume_status.create(op.get_bind(), checkfirst=True)
+    op.add_column("applications", sa.Column("resume_status", resume_status, nullable=False, server_default="ready"))
+
+
+def downgrade() -> None:
+    op.drop_column("applications", "resume_status")
+    resume_status.drop(op.get_bind(), checkfirst=True)
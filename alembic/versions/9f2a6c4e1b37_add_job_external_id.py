@@ -0,0 +1,30 @@
+"""add job external id
+
+Revision ID: 9f2a6c4e1b37
+Revises: 7c3e5b1f2d90
+Create Date: 2026-10-18 19:12:05.318274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '9f2a6c4e1b37'
+down_revision: Union[str, None] = '7c3e5b1f2d90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # NULLs never collide, so jobs created through POST /api/jobs/ are unaffected
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.add_column(sa.Column("external_id", sa.String(length=255), nullable=True))
+        batch_op.create_unique_constraint("uq_jobs_created_by_external_id", ["created_by", "external_id"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.drop_constraint("uq_jobs_created_by_external_id", type_="unique")
+        batch_op.drop_column("external_id")
@@ -0,0 +1,47 @@
+"""add query indexes
+
+Revision ID: a4d8e2b6f913
+Revises: 5e0b7f3a9c12
+Create Date: 2026-10-18 16:02:37.520914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'a4d8e2b6f913'
+down_revision: Union[str, None] = '5e0b7f3a9c12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # browse: ORDER BY created_at DESC, id DESC; company ownership lookups by created_by
+    op.create_index("ix_jobs_created_at_id", "jobs", ["created_at", "id"])
+    op.create_index("ix_jobs_created_by", "jobs", ["created_by"])
+    # a company's applicants for one job, optionally by status, newest first
+    op.create_index("ix_applications_job_status_applied", "applications", ["job_id", "status", "applied_at"])
+    # an applicant's own applications, newest first
+    op.create_index("ix_applications_applicant_applied", "applications", ["applicant_id", "applied_at"])
+    # keep the earliest of any duplicate applications the old check-then-insert let through
+    op.execute("""
+        DELETE FROM applications WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (PARTITION BY applicant_id, job_id ORDER BY applied_at, id) AS rn
+                FROM applications
+            ) ranked WHERE rn > 1
+        )
+    """)
+    with op.batch_alter_table("applications") as batch_op:
+        batch_op.create_unique_constraint("uq_applications_applicant_job", ["applicant_id", "job_id"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("applications") as batch_op:
+        batch_op.drop_constraint("uq_applications_applicant_job", type_="unique")
+    op.drop_index("ix_applications_applicant_applied", table_name="applications")
+    op.drop_index("ix_applications_job_status_applied", table_name="applications")
+    op.drop_index("ix_jobs_created_by", table_name="jobs")
+    op.drop_index("ix_jobs_created_at_id", table_name="jobs")
@@ -0,0 +1,31 @@
+"""add job location normalized
+
+Revision ID: b5d3f8a1c602
+Revises: 9f2a6c4e1b37
+Create Date: 2026-10-18 21:40:17.902316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'b5d3f8a1c602'
+down_revision: Union[str, None] = '9f2a6c4e1b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.add_column(sa.Column("location_normalized", sa.String(length=200), nullable=True))
+    # same rule as app.utils.normalize_location
+    op.execute("UPDATE jobs SET location_normalized = NULLIF(lower(trim(location)), '') WHERE location IS NOT NULL")
+    op.create_index("ix_jobs_location_normalized", "jobs", ["location_normalized"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_location_normalized", table_name="jobs")
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.drop_column("location_normalized")
@@ -0,0 +1,42 @@
+"""add resumes table
+
+Revision ID: c27e9a4f1d58
+Revises: 8d41c2f0b6a3
+Create Date: 2026-10-18 13:40:52.207614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = 'c27e9a4f1d58'
+down_revision: Union[str, None] = '8d41c2f0b6a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "resumes",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("applicant_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("sha256", sa.String(64), nullable=False),
+        sa.Column("url", sa.String(1024), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("content_type", sa.String(200), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.UniqueConstraint("applicant_id", "sha256", name="uq_resumes_applicant_sha256"),
+    )
+    with op.batch_alter_table("applications") as batch_op:
+        batch_op.add_column(sa.Column("resume_id", postgresql.UUID(as_uuid=True), nullable=True))
+        batch_op.create_foreign_key("fk_applications_resume_id", "resumes", ["resume_id"], ["id"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("applications") as batch_op:
+        batch_op.drop_constraint("fk_applications_resume_id", type_="foreignkey")
+        batch_op.drop_column("resume_id")
+    op.drop_table("resumes")
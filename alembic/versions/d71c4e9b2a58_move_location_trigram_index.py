@@ -0,0 +1,36 @@
+"""move location trigram index
+
+Revision ID: d71c4e9b2a58
+Revises: b5d3f8a1c602
+Create Date: 2026-10-18 23:05:51.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'd71c4e9b2a58'
+down_revision: Union[str, None] = 'b5d3f8a1c602'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # q_location is now a substring match on location_normalized, which the btree
+    # ix_jobs_location_normalized can't serve; nothing filters on raw location on postgres any more
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.create_index(
+        "ix_jobs_location_normalized_trgm", "jobs", ["location_normalized"],
+        postgresql_using="gin", postgresql_ops={"location_normalized": "gin_trgm_ops"},
+    )
+    op.drop_index("ix_jobs_location_trgm", table_name="jobs")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.create_index("ix_jobs_location_trgm", "jobs", ["location"], postgresql_using="gin", postgresql_ops={"location": "gin_trgm_ops"})
+    op.drop_index("ix_jobs_location_normalized_trgm", table_name="jobs")
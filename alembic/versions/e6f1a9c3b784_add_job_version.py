@@ -0,0 +1,31 @@
+"""add job version
+
+Revision ID: e6f1a9c3b784
+Revises: a4d8e2b6f913
+Create Date: 2026-10-18 16:40:11.204386
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'e6f1a9c3b784'
+down_revision: Union[str, None] = 'a4d8e2b6f913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.add_column(sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()))
+        batch_op.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+    # existing rows were last modified no later than we can tell
+    op.execute("UPDATE jobs SET updated_at = created_at WHERE created_at IS NOT NULL")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.drop_column("version")
+        batch_op.drop_column("updated_at")
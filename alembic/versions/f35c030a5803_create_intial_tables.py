@@ -9,6 +9,7 @@ from typing import Sequence, Union
 
 from alembic import op
 import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
 
 
 # revision identifiers, used by Alembic.
@@ -18,13 +19,62 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
+role_enum = sa.Enum("applicant", "company", name="roleenum")
+job_status = sa.Enum("Draft", "Open", "Closed", name="jobstatus")
+application_status = sa.Enum("Applied", "Reviewed", "Interview", "Rejected", "Hired", name="applicationstatus")
+
+
 def upgrade() -> None:
     # ### commands auto generated by Alembic - please adjust! ###
-    pass
+    op.create_table(
+        "users",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("full_name", sa.String(200), nullable=False),
+        sa.Column("email", sa.String(256), nullable=False),
+        sa.Column("password_hash", sa.String(256), nullable=False),
+        sa.Column("role", role_enum, nullable=False),
+        sa.Column("is_verified", sa.Integer()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_table(
+        "jobs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("title", sa.String(100), nullable=False),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("location", sa.String(200)),
+        sa.Column("status", job_status),
+        sa.Column("created_by", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_table(
+        "applications",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("applicant_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("job_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("jobs.id"), nullable=False),
+        sa.Column("resume_link", sa.String(1024), nullable=False),
+        sa.Column("cover_letter", sa.String(200)),
+        sa.Column("status", application_status),
+        sa.Column("applied_at", sa.DateTime()),
+    )
+    op.create_table(
+        "email_tokens",
+        sa.Column("token", sa.String(128), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    )
     # ### end Alembic commands ###
 
 
 def downgrade() -> None:
     # ### commands auto generated by Alembic - please adjust! ###
-    pass
+    op.drop_table("email_tokens")
+    op.drop_table("applications")
+    op.drop_table("jobs")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_table("users")
+    bind = op.get_bind()
+    for enum in (application_status, job_status, role_enum):
+        enum.drop(bind, checkfirst=True)
     # ### end Alembic commands ###
@@ -1,49 +1,113 @@
-from datetime import datetime, timedelta
-from jose import jwt, JWTError
-from passlib.context import CryptContext
+import functools
+from uuid import UUID
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from .config import settings
+from sqlalchemy.ext.asyncio import AsyncSession
+from .config import on_configure, settings
 from .db import get_db
 from . import models
+from .cache import TTLCache
+from .hashing import PasswordHasher, PasswordHasherBusy, default_workers
+from .tokens import create_access_token, decode_access_token
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+_password_hasher = None
+
+def get_password_hasher() -> PasswordHasher:
+    # built on first use so importing this module reads no settings
+    global _password_hasher
+    if _password_hasher is None:
+        _password_hasher = PasswordHasher(
+            rounds=settings.BCRYPT_ROUNDS,
+            workers=settings.PASSWORD_HASH_WORKERS if settings.PASSWORD_HASH_WORKERS is not None else default_workers(),
+            max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+        )
+    return _password_hasher
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+def shutdown_password_hasher():
+    global _password_hasher
+    if _password_hasher is not None:
+        _password_hasher.shutdown()
+        _password_hasher = None
+
+on_configure(shutdown_password_hasher)
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+def _hasher_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many authentication requests, retry shortly",
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
 
-def create_access_token(data: dict, expires_minutes: int = None):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=(expires_minutes or settings.ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    encoded = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
-    return encoded
+async def hash_password(password: str) -> str:
+    try:
+        return await get_password_hasher().hash(password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
 
-def decode_access_token(token: str):
+async def verify_password_and_update(plain: str, hashed: str):
+    """Return (valid, new_hash); new_hash is set when the stored hash should be upgraded."""
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        return payload
-    except JWTError:
-        return None
+        return await get_password_hasher().verify_and_update(plain, hashed)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+
+async def verify_password(plain: str, hashed: str) -> bool:
+    return (await verify_password_and_update(plain, hashed))[0]
+
+class Principal:
+    """The authenticated caller, as much of the user row as request handlers need."""
+    __slots__ = ("id", "role", "is_verified", "full_name")
+
+    def __init__(self, id, role, is_verified, full_name):
+        self.id = id
+        self.role = role
+        self.is_verified = is_verified
+        self.full_name = full_name
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    @classmethod
+    def from_user(cls, user: models.User):
+        return cls(user.id, user.role, bool(user.is_verified), user.full_name)
+
+# token subject -> Principal; bounded, and entries expire so stale state self-heals
+@functools.cache
+def _principals():
+    return TTLCache(maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+on_configure(_principals.cache_clear)
+
+def invalidate_principal(user_id):
+    """Call after changing a user's role or verification state."""
+    _principals().pop(str(user_id))
+
+def get_token_payload(token: str = Depends(oauth2_scheme)):
     payload = decode_access_token(token)
-    if not payload:
+    if not payload or not payload.get("user_id"):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication token")
-    user_id = payload.get("user_id")
-    role = payload.get("role")
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    return payload
+
+async def get_current_user(payload: dict = Depends(get_token_payload), db: AsyncSession = Depends(get_db)):
+    user_id = payload["user_id"]
+    principal = _principals().get(user_id)
+    if principal is not None:
+        return principal
+    try:
+        user_uuid = UUID(user_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication token")
+    user = await db.get(models.User, user_uuid)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    return user
+    principal = Principal.from_user(user)
+    _principals().set(user_id, principal)
+    return principal
 
 def require_role(role: str):
-    def role_dependency(current_user=Depends(get_current_user)):
+    async def role_dependency(payload: dict = Depends(get_token_payload), db: AsyncSession = Depends(get_db)):
+        # the role claim is signed by us, so a mismatch is rejected before any lookup
+        if payload.get("role") != role:
+            raise HTTPException(status_code=403, detail="Forbidden")
+        current_user = await get_current_user(payload, db)
         if current_user.role.value != role:
             raise HTTPException(status_code=403, detail="Forbidden")
         return current_user
@@ -1,20 +1,115 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # comma-separated read replica URLs; empty sends reads to the primary
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_SELECTION: str = "round_robin"  # round_robin | least_connections
+    # after a write the caller reads the primary this long; pinned in-process and by a signed
+    # write_pin cookie, so across workers/instances it holds only for clients that keep cookies
+    READ_YOUR_WRITES_SECONDS: int = 5
     SMTP_HOST: str = None
     SMTP_PORT: int = 465
     SMTP_USER: str = None
     SMTP_PASSWORD: str = None
+    # upgrade the connection with STARTTLS before logging in; off for relays that only speak plain SMTP
+    SMTP_STARTTLS: bool = True
     EMAIL_FROM: str
+    # outbox worker (python -m app.email_worker)
+    SMTP_IDLE_TIMEOUT_SECONDS: int = 60
+    EMAIL_BATCH_SIZE: int = 50
+    EMAIL_POLL_SECONDS: float = 2.0
+    EMAIL_MAX_ATTEMPTS: int = 8
+    EMAIL_RETRY_BASE_SECONDS: int = 30
+    EMAIL_RETRY_MAX_SECONDS: int = 3600
+    EMAIL_RATE_LIMIT_PER_SECOND: float = 10.0
+    EMAIL_RATE_LIMIT_BURST: int = 10
     CLOUDINARY_CLOUD_NAME: str
     CLOUDINARY_API_KEY: str
     CLOUDINARY_API_SECRET: str
+    STORAGE_BACKEND: str = "cloudinary"  # cloudinary | local
+    LOCAL_STORAGE_DIR: str = "uploads"
+    LOCAL_STORAGE_BASE_URL: Optional[str] = None
+    RESUME_MAX_BYTES: int = 10 * 1024 * 1024
+    # a claim still pending after this long lost its request mid-upload; a new apply may take it over
+    APPLICATION_CLAIM_TIMEOUT_SECONDS: int = 900
     # FRONTEND_BASE_URL: AnyHttpUrl = "http://localhost:3000"
     VERIFICATION_TOKEN_EXPIRE_MINUTES: int = 60
+    TOKEN_SWEEP_BATCH_SIZE: int = 1000
+    TOKEN_SWEEP_INTERVAL_SECONDS: int = 3600
+    # totalSize for listings: exact | cached | estimate | has_more
+    COUNT_STRATEGY: str = "exact"
+    COUNT_CACHE_TTL_SECONDS: int = 30
+    COUNT_CACHE_SIZE: int = 4096
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    CACHE_CONTROL_JOB_DETAIL: str = "private, max-age=0, must-revalidate"
+    CACHE_CONTROL_JOB_BROWSE: str = "private, max-age=0, must-revalidate"
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_SIZE: int = 1024
+    RESPONSE_CACHE_TTL_SECONDS: int = 15
+    RESPONSE_CACHE_SHARED: str = ""  # "", "memory" or "redis"
+    REDIS_URL: str = "redis://localhost:6379/0"
+    # browse facet counts; shared across pages of the same search, dropped on any job write
+    FACET_CACHE_SIZE: int = 1024
+    FACET_CACHE_TTL_SECONDS: int = 60
+    FACET_LIMIT: int = 20
+    # POST /api/jobs/import: rows per multi-row upsert, and "atomic" (one transaction) or "chunked" (commit per batch)
+    JOB_IMPORT_BATCH_SIZE: int = 500
+    JOB_IMPORT_MAX_ROWS: int = 10000
+    JOB_IMPORT_MAX_BYTES: int = 20 * 1024 * 1024
+    JOB_IMPORT_MODE: str = "atomic"
+    # rows fetched per round trip by the streaming application export
+    EXPORT_BATCH_SIZE: int = 1000
+    METRICS_ENABLED: bool = True
+    # /metrics is only served when this is set, to scrapers sending "Authorization: Bearer <token>"
+    METRICS_TOKEN: str = ""
+    SLOW_QUERY_MS: int = 200
+    BCRYPT_ROUNDS: int = 12
+    # bcrypt process pool; None sizes it from the cpu count, 0 hashes inline
+    PASSWORD_HASH_WORKERS: Optional[int] = None
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
     class Config:
         env_file = ".env"
 
-settings = Settings()
+class LazySettings:
+    """Reads Settings from the environment on first use, unless ``configure`` installed one first.
+
+    Importing the app therefore needs no environment; modules keep ``from .config import settings``.
+    """
+
+    def __init__(self):
+        self._settings = None
+
+    def __getattr__(self, name):
+        if self._settings is None:
+            self._settings = Settings()
+        return getattr(self._settings, name)
+
+settings = LazySettings()
+
+_resets = []
+
+def on_configure(reset):
+    """Register ``reset`` to drop state built from the old settings when ``configure`` installs new ones."""
+    _resets.append(reset)
+
+def configure(new_settings: Settings):
+    """Use ``new_settings`` from now on (see main.create_app).
+
+    Caches, token signers and engines built from earlier settings are dropped and
+    rebuilt on next use. Engines are not disposed here; await db.dispose_engines() first
+    if the old ones served requests.
+    """
+    settings._settings = new_settings
+    for reset in _resets:
+        reset()
@@ -0,0 +1,80 @@
+import functools
+import json
+import threading
+from sqlalchemy import func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from .cache import TTLCache
+from .config import on_configure, settings
+from .search import is_postgres
+from .utils import normalize_params
+
+# how totalSize is produced for paginated endpoints
+COUNT_STRATEGIES = ("exact", "cached", "estimate", "has_more")
+
+@functools.cache
+def _counts():
+    return TTLCache(maxsize=settings.COUNT_CACHE_SIZE, ttl=settings.COUNT_CACHE_TTL_SECONDS)
+
+on_configure(_counts.cache_clear)
+
+# bumping a namespace's generation orphans every cached count for it; entries then age out
+_generations = {"jobs": 0, "applications": 0}
+_generation_lock = threading.Lock()
+
+class explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+@compiles(explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+def invalidate(namespace: str):
+    """Drop cached counts for a namespace after a write. Only affects this process; the TTL bounds staleness elsewhere."""
+    with _generation_lock:
+        _generations[namespace] += 1
+
+async def exact_count(db: AsyncSession, query) -> int:
+    return await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+
+async def _planner_estimate(db: AsyncSession, query):
+    if not is_postgres(db):
+        return None
+    plan = (await db.execute(explain(query.order_by(None)))).scalar()
+    if isinstance(plan, str):
+        # asyncpg hands json back undecoded
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def resolve_strategy(requested: str = None) -> str:
+    strategy = requested or settings.COUNT_STRATEGY
+    if strategy not in COUNT_STRATEGIES:
+        raise ValueError(f"unknown count strategy {strategy!r}")
+    return strategy
+
+async def count_total(db: AsyncSession, query, strategy: str, namespace: str, filters: dict):
+    """Return (totalSize, strategy actually used) for a filtered listing query.
+
+    ``filters`` must contain everything that scopes the query (including the
+    owning user or job), since it forms the cache key for the cached strategy.
+    """
+    if strategy == "has_more":
+        return None, "has_more"
+    if strategy == "estimate":
+        estimate = await _planner_estimate(db, query)
+        if estimate is not None:
+            return estimate, "estimate"
+        # no planner statistics off postgres, so fall through to an exact count
+        strategy = "exact"
+    if strategy == "cached":
+        key = (namespace, _generations[namespace], normalize_params(filters))
+        total = _counts().get(key)
+        if total is None:
+            total = await exact_count(db, query)
+            _counts().set(key, total)
+        return total, "cached"
+    return await exact_count(db, query), "exact"
@@ -1,64 +1,344 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, delete, update, func, text, case, or_, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 import uuid
-from . import models, schemas
+from . import models, counting, response_cache
 from .config import settings
+from .utils import normalize_location, parse_uuid
 
-def create_user(db: Session, full_name: str, email: str, password_hash: str, role: str):
-    user = models.User(full_name=full_name, email=email, password_hash=password_hash, role=role)
+async def create_user(db: AsyncSession, full_name: str, email: str, password_hash: str, role: str, commit: bool = True):
+    user = models.User(id=uuid.uuid4(), full_name=full_name, email=email, password_hash=password_hash, role=role)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    if commit:
+        await db.commit()
+        await db.refresh(user)
     return user
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(models.User).where(models.User.email == email))
 
-def create_email_token(db: Session, user_id):
-    token = str(uuid.uuid4())
-    expires = datetime.utcnow() + timedelta(minutes=settings.VERIFICATION_TOKEN_EXPIRE_MINUTES)
-    et = models.EmailVerificationToken(token=token, user_id=user_id, expires_at=expires)
-    db.add(et)
-    db.commit()
-    return et
+async def get_user(db: AsyncSession, user_id):
+    return await db.get(models.User, user_id)
 
-def get_token(db: Session, token_str: str):
-    return db.query(models.EmailVerificationToken).filter(models.EmailVerificationToken.token == token_str).first()
+async def mark_verified(db: AsyncSession, user_id) -> bool:
+    """Set is_verified once; False if the user was already verified (or doesn't exist). Commits."""
+    result = await db.execute(
+        update(models.User).where(models.User.id == user_id, models.User.is_verified == 0).values(is_verified=1)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return bool(result.rowcount)
 
-def delete_token(db: Session, token_str: str):
-    db.query(models.EmailVerificationToken).filter(models.EmailVerificationToken.token == token_str).delete()
-    db.commit()
+# legacy table-backed verification tokens; new tokens are signed (tokens.create_verification_token)
+async def get_token(db: AsyncSession, token_str: str):
+    return await db.scalar(select(models.EmailVerificationToken).where(models.EmailVerificationToken.token == token_str))
+
+async def delete_token(db: AsyncSession, token_str: str, commit: bool = True):
+    await db.execute(delete(models.EmailVerificationToken).where(models.EmailVerificationToken.token == token_str))
+    if commit:
+        await db.commit()
+
+async def delete_stale_tokens(db: AsyncSession, batch_size: int) -> int:
+    """Delete up to ``batch_size`` expired or already-used legacy tokens; returns how many went."""
+    verified = select(models.User.id).where(models.User.is_verified == 1)
+    batch = (
+        select(models.EmailVerificationToken.token)
+        .where((models.EmailVerificationToken.expires_at < datetime.utcnow()) | models.EmailVerificationToken.user_id.in_(verified))
+        .limit(batch_size)
+    )
+    result = await db.execute(delete(models.EmailVerificationToken).where(models.EmailVerificationToken.token.in_(batch)))
+    await db.commit()
+    return result.rowcount
 
 # Jobs CRUD
-def create_job(db: Session, user, title, description, location, status=None):
-    job = models.Job(title=title, description=description, location=location, status=status or models.JobStatus.Draft, created_by=user.id)
+async def jobs_changed():
+    """Drop cached job counts, rendered browse pages and facet counts; call after any committed job write."""
+    counting.invalidate("jobs")
+    await response_cache.jobs_browse.invalidate()
+    await response_cache.jobs_facets.invalidate()
+
+async def create_job(db: AsyncSession, user, title, description, location, status=None):
+    job = models.Job(title=title, description=description, location=location, location_normalized=normalize_location(location),
+                     status=status or models.JobStatus.Draft, created_by=user.id)
     db.add(job)
-    db.commit()
-    db.refresh(job)
+    await db.commit()
+    await db.refresh(job)
+    await jobs_changed()
     return job
 
-def get_job(db: Session, job_id):
-    return db.query(models.Job).filter(models.Job.id == job_id).first()
+async def get_job(db: AsyncSession, job_id):
+    # malformed ids are simply "not found" rather than a driver error
+    job_uuid = parse_uuid(job_id)
+    if job_uuid is None:
+        return None
+    return await db.get(models.Job, job_uuid)
 
-def update_job(db: Session, job, **kwargs):
+async def update_job(db: AsyncSession, job, **kwargs):
     for k,v in kwargs.items():
         setattr(job, k, v)
+    if "location" in kwargs:
+        job.location_normalized = normalize_location(kwargs["location"])
+    job.version = models.Job.version + 1
+    job.updated_at = func.now()
     db.add(job)
-    db.commit()
-    db.refresh(job)
+    await db.commit()
+    await db.refresh(job)
+    await jobs_changed()
     return job
 
-def delete_job(db: Session, job):
-    db.delete(job)
-    db.commit()
+async def delete_job(db: AsyncSession, job):
+    await db.delete(job)
+    await db.commit()
+    await jobs_changed()
+
+async def upsert_jobs(db: AsyncSession, owner_id, rows, commit: bool = True):
+    """Insert or update ``rows`` (schemas.JobImportRow) for one company in multi-row statements.
+
+    Rows with an external_id that the company already has update that job (title,
+    description, location, and status when given) and bump its version. A row whose
+    status the job can't move to (models.JOB_STATUS_TRANSITIONS) leaves the job as it is.
+    Returns [(job_id, created)] in input order, job_id None for those rejected rows.
+    external_ids must be unique within ``rows``.
+    """
+    external_ids = [r.external_id for r in rows if r.external_id]
+    existing = set()
+    if external_ids:
+        existing = set((await db.scalars(select(models.Job.external_id).where(
+            models.Job.created_by == owner_id, models.Job.external_id.in_(external_ids)))).all())
+    values = [{"id": uuid.uuid4(), "title": r.title, "description": r.description, "location": r.location,
+               "location_normalized": normalize_location(r.location), "status": models.JobStatus(r.status or "Draft"), "created_by": owner_id, "external_id": r.external_id} for r in rows]
+    ids = {}
+    # an omitted status leaves an existing job's status alone, so those rows get their own statement
+    for with_status in (True, False):
+        batch = [v for v, r in zip(values, rows) if (r.status is not None) == with_status]
+        if not batch:
+            continue
+        stmt = _insert(db, models.Job).values(batch)
+        updates = {"title": stmt.excluded.title, "description": stmt.excluded.description, "location": stmt.excluded.location,
+                   "location_normalized": stmt.excluded.location_normalized, "version": models.Job.version + 1, "updated_at": func.now()}
+        allowed = None
+        if with_status:
+            updates["status"] = stmt.excluded.status
+            # same rules as PUT /api/jobs/{id}; a row that breaks them updates nothing and returns no id
+            allowed = or_(models.Job.status == stmt.excluded.status, *[
+                and_(models.Job.status == current, stmt.excluded.status == target)
+                for current, targets in models.JOB_STATUS_TRANSITIONS.items() for target in targets
+            ])
+        stmt = stmt.on_conflict_do_update(index_elements=["created_by", "external_id"], set_=updates, where=allowed)
+        for job_id, external_id in (await db.execute(stmt.returning(models.Job.id, models.Job.external_id))).all():
+            if external_id:
+                ids[external_id] = job_id
+    if commit:
+        await db.commit()
+        await jobs_changed()
+    return [(ids.get(r.external_id) if r.external_id else v["id"], r.external_id not in existing) for v, r in zip(values, rows)]
+
+# Resumes
+def _insert(db: AsyncSession, model):
+    # dialect-specific insert, for ON CONFLICT support on postgres and sqlite
+    if db.bind.dialect.name == "postgresql":
+        return pg_insert(model)
+    return sqlite_insert(model)
+
+async def get_resume_by_hash(db: AsyncSession, applicant_id, sha256: str):
+    return await db.scalar(select(models.Resume).where(models.Resume.applicant_id == applicant_id, models.Resume.sha256 == sha256))
+
+async def get_latest_resume(db: AsyncSession, applicant_id):
+    """The resume on the applicant's most recent application; a re-upload of an older file counts as using it again."""
+    return await db.scalar(
+        select(models.Resume)
+        .join(models.Application, models.Application.resume_id == models.Resume.id)
+        .where(models.Application.applicant_id == applicant_id)
+        .order_by(models.Application.applied_at.desc(), models.Application.id.desc())
+        .limit(1)
+    )
+
+async def save_resume(db: AsyncSession, applicant_id, sha256: str, url: str, size: int, content_type: str):
+    # a concurrent apply may have stored the same file first; keep whichever row won
+    stmt = _insert(db, models.Resume).values(
+        id=uuid.uuid4(), applicant_id=applicant_id, sha256=sha256, url=url, size=size, content_type=content_type,
+    ).on_conflict_do_nothing(index_elements=["applicant_id", "sha256"])
+    await db.execute(stmt)
+    await db.commit()
+    return await get_resume_by_hash(db, applicant_id, sha256)
 
 # Applications
-def create_application(db: Session, applicant_id, job_id, resume_link, cover_letter):
-    app = models.Application(applicant_id=applicant_id, job_id=job_id, resume_link=resume_link, cover_letter=cover_letter)
-    db.add(app)
-    db.commit()
-    db.refresh(app)
-    return app
-
-def get_application_by_applicant_job(db: Session, applicant_id, job_id):
-    return db.query(models.Application).filter(models.Application.applicant_id==applicant_id, models.Application.job_id==job_id).first()
+async def _bump_status_counts(db: AsyncSession, deltas):
+    """Apply {(job_id, status): delta} to job_status_counts in one upsert, inside the caller's transaction."""
+    rows = [{"job_id": job_id, "status": models.ApplicationStatus(st), "count": delta} for (job_id, st), delta in deltas.items() if delta]
+    if not rows:
+        return
+    stmt = _insert(db, models.JobStatusCount).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["job_id", "status"],
+        set_={"count": models.JobStatusCount.count + stmt.excluded["count"]},
+    )
+    await db.execute(stmt)
+
+def visible_to_company():
+    """Filter for company-facing reads: only applications whose resume made it (see claim_application)."""
+    return models.Application.resume_status == models.ResumeStatus.ready
+
+async def claim_application(db: AsyncSession, applicant_id, job_id, cover_letter):
+    """Insert a pending application unless this applicant already applied; returns (application_id, created).
+
+    The unique (applicant_id, job_id) constraint makes the decision, so double submits can't both insert.
+    A conflicting row whose upload failed, or that has been pending longer than
+    APPLICATION_CLAIM_TIMEOUT_SECONDS (the request died mid-upload), is taken over and
+    starts again as a fresh claim. One statement either way: the conflict update always
+    returns the row, and only a new or taken-over claim carries our applied_at. Claims stay
+    out of company listings, exports and counters until set_resume_result attaches a resume.
+    """
+    application = models.Application
+    now = datetime.utcnow()
+    stmt = _insert(db, application).values(
+        id=uuid.uuid4(), applicant_id=applicant_id, job_id=job_id, resume_link="", cover_letter=cover_letter,
+        resume_status=models.ResumeStatus.pending, resume_id=None, applied_at=now,
+    )
+    abandoned = or_(
+        application.resume_status == models.ResumeStatus.failed,
+        and_(application.resume_status == models.ResumeStatus.pending,
+             application.applied_at < now - timedelta(seconds=settings.APPLICATION_CLAIM_TIMEOUT_SECONDS)),
+    )
+    # every SET expression sees the existing row, so all of them agree on ``abandoned``
+    take_over = {column: case((abandoned, stmt.excluded[column]), else_=getattr(application, column))
+                 for column in ("resume_link", "resume_id", "resume_status", "cover_letter", "applied_at")}
+    stmt = stmt.on_conflict_do_update(index_elements=["applicant_id", "job_id"], set_=take_over).returning(application.id, application.applied_at)
+    application_id, applied_at = (await db.execute(stmt)).one()
+    if applied_at != now:
+        await db.rollback()
+        return application_id, False
+    await db.commit()
+    counting.invalidate("applications")
+    return application_id, True
+
+async def release_application(db: AsyncSession, application_id):
+    # undo a claim whose resume never made it; it was never counted
+    await db.rollback()
+    await db.execute(
+        delete(models.Application).where(models.Application.id == application_id, models.Application.resume_status == models.ResumeStatus.pending)
+    )
+    await db.commit()
+    counting.invalidate("applications")
+
+async def set_resume_result(db: AsyncSession, application_id, resume):
+    """Finish a claim: attach the stored resume (companies see it from now on), or mark it failed when there is none."""
+    if resume:
+        values = {"resume_link": resume.url, "resume_id": resume.id, "resume_status": models.ResumeStatus.ready}
+    else:
+        values = {"resume_status": models.ResumeStatus.failed}
+    result = await db.execute(
+        update(models.Application)
+        .where(models.Application.id == application_id, models.Application.resume_status == models.ResumeStatus.pending)
+        .values(**values)
+        .returning(models.Application.job_id, models.Application.status)
+        .execution_options(synchronize_session=False)
+    )
+    row = result.first()
+    if row and resume:
+        await _bump_status_counts(db, {(row.job_id, row.status): 1})
+    await db.commit()
+    if row:
+        counting.invalidate("applications")
+
+async def get_application_with_job(db: AsyncSession, application_id):
+    app_uuid = parse_uuid(application_id)
+    if app_uuid is None:
+        return None
+    row = (await db.execute(
+        select(models.Application, models.Job).join(models.Job, models.Application.job_id == models.Job.id).where(models.Application.id == app_uuid, visible_to_company())
+    )).first()
+    return tuple(row) if row else None
+
+async def update_application_status(db: AsyncSession, app, new_status, commit=True):
+    """Move ``app`` to ``new_status``; False if it changed concurrently and nothing was written."""
+    old_status, new_status = app.status, models.ApplicationStatus(new_status)
+    # conditional on the status we read, so a concurrent change can't move the counters twice
+    result = await db.execute(
+        update(models.Application)
+        .where(models.Application.id == app.id, models.Application.status == old_status)
+        .values(status=new_status)
+        .execution_options(synchronize_session=False)
+    )
+    changed = bool(result.rowcount)
+    if changed and old_status != new_status:
+        await _bump_status_counts(db, {(app.job_id, old_status): -1, (app.job_id, new_status): 1})
+    if commit:
+        await db.commit()
+    counting.invalidate("applications")
+    return changed
+
+async def get_applications_for_update(db: AsyncSession, application_ids):
+    """Rows of (id, job_id, status, job_title, job_owner, applicant_email) for the given applications, in one query."""
+    return (await db.execute(
+        select(
+            models.Application.id,
+            models.Application.job_id,
+            models.Application.status,
+            models.Job.title.label("job_title"),
+            models.Job.created_by.label("job_owner"),
+            models.User.email.label("applicant_email"),
+        )
+        .join(models.Job, models.Application.job_id == models.Job.id)
+        .join(models.User, models.Application.applicant_id == models.User.id)
+        .where(models.Application.id.in_(application_ids), visible_to_company())
+    )).all()
+
+async def bulk_update_application_status(db: AsyncSession, current, new_status, owner_id, commit=True):
+    """Move applications to ``new_status``; ``current`` maps id -> (job_id, status) as read by the caller.
+
+    One UPDATE per distinct current status, each conditional on it, so rows changed
+    concurrently are skipped rather than double counted. Returns the updated ids.
+    """
+    new_status = models.ApplicationStatus(new_status)
+    owned_jobs = select(models.Job.id).where(models.Job.created_by == owner_id)
+    by_status = {}
+    for application_id, (job_id, st) in current.items():
+        by_status.setdefault(st, []).append(application_id)
+    updated, deltas = set(), {}
+    for old_status, ids in by_status.items():
+        if old_status == new_status:
+            # already there; nothing to write or count
+            updated.update(await db.scalars(
+                select(models.Application.id).where(models.Application.id.in_(ids), models.Application.job_id.in_(owned_jobs), models.Application.status == old_status)
+            ))
+            continue
+        result = await db.execute(
+            update(models.Application)
+            .where(models.Application.id.in_(ids), models.Application.job_id.in_(owned_jobs), models.Application.status == old_status)
+            .values(status=new_status)
+            .returning(models.Application.id, models.Application.job_id)
+            .execution_options(synchronize_session=False)
+        )
+        for application_id, job_id in result.all():
+            updated.add(application_id)
+            deltas[(job_id, old_status)] = deltas.get((job_id, old_status), 0) - 1
+            deltas[(job_id, new_status)] = deltas.get((job_id, new_status), 0) + 1
+    await _bump_status_counts(db, deltas)
+    if commit:
+        await db.commit()
+    counting.invalidate("applications")
+    return updated
+
+async def get_dashboard_counts(db: AsyncSession, owner_id):
+    """(job id, title, job status, application status, count) rows for every job the company owns; one indexed read."""
+    return (await db.execute(
+        select(models.Job.id, models.Job.title, models.Job.status, models.JobStatusCount.status.label("application_status"), models.JobStatusCount.count)
+        .outerjoin(models.JobStatusCount, models.JobStatusCount.job_id == models.Job.id)
+        .where(models.Job.created_by == owner_id)
+        .order_by(models.Job.created_at.desc(), models.Job.id.desc())
+    )).all()
+
+async def reconcile_status_counts(db: AsyncSession):
+    """Rebuild job_status_counts from applications in one transaction; returns the number of counter rows."""
+    if db.bind.dialect.name == "postgresql":
+        # writers' upserts wait for us, then apply on top of the rebuilt values
+        await db.execute(text("LOCK TABLE job_status_counts IN EXCLUSIVE MODE"))
+    await db.execute(delete(models.JobStatusCount))
+    grouped = select(models.Application.job_id, models.Application.status, func.count()).where(models.Application.status.is_not(None), visible_to_company()).group_by(models.Application.job_id, models.Application.status)
+    await db.execute(insert(models.JobStatusCount).from_select(["job_id", "status", "count"], grouped))
+    rows = await db.scalar(select(func.count()).select_from(models.JobStatusCount))
+    await db.commit()
+    return rows
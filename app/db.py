@@ -1,15 +1,176 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from .config import settings
+import functools
+import itertools
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base
+from .cache import TTLCache
+from .config import on_configure, settings
+from . import metrics
+from .tokens import WRITE_PIN_COOKIE, create_write_pin, read_write_pin, request_subject
 
-engine = create_engine(settings.DATABASE_URL, future=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# DATABASE_URL stays a plain sync URL (alembic uses it as-is); the app swaps in the async driver
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def async_database_url(url: str):
+    u = make_url(url)
+    return u.set(drivername=_ASYNC_DRIVERS.get(u.get_backend_name(), u.drivername))
+
+def engine_options(url) -> dict:
+    options = {"future": True, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if url.get_backend_name() != "sqlite":
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+        if settings.METRICS_ENABLED:
+            options["poolclass"] = metrics.TimedAsyncAdaptedQueuePool
+    return options
+
+def _create_engine(url: str):
+    url = async_database_url(url)
+    return create_async_engine(url, **engine_options(url))
+
+class ReplicaSet:
+    """Picks a read replica engine, round robin or by fewest checked-out connections."""
+
+    def __init__(self, engines, selection: str = "round_robin"):
+        if selection not in ("round_robin", "least_connections"):
+            raise ValueError(f"unknown replica selection {selection!r}")
+        self.engines = engines
+        self.selection = selection
+        self._next = itertools.count()
+
+    def __bool__(self):
+        return bool(self.engines)
+
+    def choose(self):
+        if self.selection == "least_connections":
+            return min(self.engines, key=lambda e: getattr(e.sync_engine.pool, "checkedout", lambda: 0)())
+        return self.engines[next(self._next) % len(self.engines)]
+
+# users who wrote recently read from the primary until this expires (read-your-writes)
+@functools.cache
+def _writers():
+    return TTLCache(maxsize=100_000, ttl=settings.READ_YOUR_WRITES_SECONDS)
+
+on_configure(_writers.cache_clear)
+
+class RoutingSession(Session):
+    pass
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pin_writer_to_primary(session):
+    request = session.info.get("request")
+    subject = request_subject(request) if request is not None else None
+    if subject:
+        _writers().set(subject, True)
+        # WritePinMiddleware hands it to the client, for requests that land on another process
+        request.state.write_pin = subject
+
+def init_engines():
+    """Create the primary and replica engines from settings, once. No connection is opened here.
+
+    Runs from the app's lifespan, or on first use by scripts. Until then ``engine``
+    and ``replicas`` don't exist, so importing this module needs neither settings nor a driver.
+    """
+    global engine, replicas
+    if "engine" in globals():
+        return
+    primary = _create_engine(settings.DATABASE_URL)
+    replica_set = ReplicaSet(
+        [_create_engine(u.strip()) for u in settings.DATABASE_REPLICA_URLS.split(",") if u.strip()],
+        settings.REPLICA_SELECTION,
+    )
+    if settings.METRICS_ENABLED:
+        for e in [primary, *replica_set.engines]:
+            metrics.instrument_engine(e)
+    SessionLocal.configure(bind=primary)
+    engine, replicas = primary, replica_set
+
+def __getattr__(name):
+    # `from .db import engine` creates the engines on demand
+    if name in ("engine", "replicas"):
+        init_engines()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class _SessionMaker(async_sessionmaker):
+    def __call__(self, **local_kw):
+        init_engines()
+        return super().__call__(**local_kw)
+
+SessionLocal = _SessionMaker(class_=AsyncSession, sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 # dependency for requests
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db(request: Request):
+    async with SessionLocal() as db:
+        db.info["request"] = request
         yield db
-    finally:
-        db.close()
+
+# dependency for read-only routes: a replica unless this caller wrote within READ_YOUR_WRITES_SECONDS
+def pinned_to_primary(request: Request) -> bool:
+    """True when replicas exist and this caller wrote within READ_YOUR_WRITES_SECONDS.
+
+    Such a caller reads the primary, and must also skip caches a replica read may have refilled.
+    """
+    init_engines()
+    if not replicas:
+        return False
+    subject = request_subject(request)
+    if not subject:
+        return False
+    return bool(_writers().get(subject)) or read_write_pin(request.cookies.get(WRITE_PIN_COOKIE), subject)
+
+class WritePinMiddleware:
+    """Sets the signed read-your-writes cookie on responses to requests that committed a write.
+
+    The in-process pin only covers the worker that took the write; with several workers or
+    instances the caller's next read usually lands elsewhere and checks this cookie instead.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_with_pin(message):
+            subject = scope.get("state", {}).get("write_pin")
+            if message["type"] == "http.response.start" and subject:
+                cookie = f"{WRITE_PIN_COOKIE}={create_write_pin(subject)}; Max-Age={settings.READ_YOUR_WRITES_SECONDS}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
+
+def read_bind(request: Request):
+    if pinned_to_primary(request):
+        return engine
+    return replicas.choose() if replicas else engine
+
+async def get_read_db(request: Request):
+    async with SessionLocal(bind=read_bind(request)) as db:
+        db.info["request"] = request
+        yield db
+
+def _reset_engines():
+    # the next init_engines() builds engines from the current settings
+    globals().pop("engine", None)
+    globals().pop("replicas", None)
+    SessionLocal.configure(bind=None)
+
+on_configure(_reset_engines)
+
+async def dispose_engines():
+    if "engine" not in globals():
+        return
+    await engine.dispose()
+    for replica in replicas.engines:
+        await replica.dispose()
+    _reset_engines()
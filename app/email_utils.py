@@ -1,22 +1,71 @@
-from fastapi import BackgroundTasks
-from .config import settings
-import smtplib
+from datetime import datetime
+import time
 from email.message import EmailMessage
+from .config import settings
+from . import models
 
-def send_email_sync(to_email: str, subject: str, html_content: str):
+def build_message(to_email: str, subject: str, html_content: str) -> EmailMessage:
     msg = EmailMessage()
     msg["Subject"] = subject
     msg["From"] = settings.EMAIL_FROM
     msg["To"] = to_email
     msg.set_content(html_content, subtype="html")
-    # simple SMTP - replace with SendGrid or other provider in prod
-    if not settings.SMTP_HOST:
-        print("SMTP not configured, email content:", html_content)
-        return
-    with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as s:
-        s.starttls()
-        s.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-        s.send_message(msg)
-
-def send_email_background(background_tasks: BackgroundTasks, to_email: str, subject: str, html_content: str):
-    background_tasks.add_task(send_email_sync, to_email, subject, html_content)
+    return msg
+
+def enqueue_email(db, to_email: str, subject: str, html_content: str):
+    """Queue an email in the caller's transaction; app.email_worker sends it once that commits."""
+    db.add(models.EmailOutbox(to_email=to_email, subject=subject, html_content=html_content, next_attempt_at=datetime.utcnow()))
+
+class SMTPMailer:
+    """Keeps one SMTP session open across sends, reconnecting when it drops or has idled too long."""
+
+    def __init__(self, host: str, port: int, user: str, password: str, idle_timeout: float, starttls: bool = True):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.idle_timeout = idle_timeout
+        self.starttls = starttls
+        self._conn = None
+        self._last_used = 0.0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(settings.SMTP_HOST, settings.SMTP_PORT, settings.SMTP_USER, settings.SMTP_PASSWORD, settings.SMTP_IDLE_TIMEOUT_SECONDS, settings.SMTP_STARTTLS)
+
+    def _connection(self):
+        # smtplib (and ssl) load here, in the outbox worker, rather than when the web app imports this module
+        import smtplib
+        if self._conn is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+        if self._conn is None:
+            conn = smtplib.SMTP(self.host, self.port)
+            if self.starttls:
+                conn.starttls()
+            if self.user:
+                conn.login(self.user, self.password)
+            self._conn = conn
+        return self._conn
+
+    def send(self, msg: EmailMessage):
+        # simple SMTP - replace with SendGrid or other provider in prod
+        if not self.host:
+            print("SMTP not configured, email content:", msg.get_content())
+            return
+        import smtplib
+        try:
+            self._connection().send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # the server closed our idle session; one fresh connection before giving up
+            self.close()
+            self._connection().send_message(msg)
+        self._last_used = time.monotonic()
+
+    def close(self):
+        import smtplib
+        if self._conn is not None:
+            try:
+                self._conn.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._conn = None
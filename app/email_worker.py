@@ -0,0 +1,108 @@
+"""Drains the email outbox.
+
+Run alongside the API: python -m app.email_worker
+"""
+import asyncio
+import logging
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from .config import settings
+from .db import SessionLocal
+from .email_utils import SMTPMailer, build_message
+from . import models
+
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    """Token bucket; wait() blocks until a send is allowed."""
+
+    def __init__(self, rate_per_second: float, burst: int = 1):
+        self.rate = rate_per_second
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                time.sleep((1 - self._tokens) / self.rate)
+                self._tokens = 1
+                self._updated = time.monotonic()
+            self._tokens -= 1
+
+def backoff_seconds(attempts: int) -> float:
+    return min(settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.EMAIL_RETRY_MAX_SECONDS)
+
+def _send_batch(mailer: SMTPMailer, limiter: RateLimiter, messages):
+    """Send (id, to, subject, html) tuples over the mailer's shared connection; returns {id: error or None}."""
+    results = {}
+    for message_id, to_email, subject, html_content in messages:
+        limiter.wait()
+        try:
+            mailer.send(build_message(to_email, subject, html_content))
+            results[message_id] = None
+        except (smtplib.SMTPException, OSError) as e:
+            mailer.close()
+            results[message_id] = f"{type(e).__name__}: {e}"
+    return results
+
+async def drain_once(mailer: SMTPMailer, limiter: RateLimiter, batch_size: int) -> int:
+    """Claim one batch of due messages, send them, and record the outcome. Returns the batch size."""
+    async with SessionLocal() as db:
+        now = datetime.utcnow()
+        # SKIP LOCKED lets several workers drain concurrently without double-sending
+        rows = (await db.scalars(
+            select(models.EmailOutbox)
+            .where(models.EmailOutbox.status == models.OutboxStatus.pending, models.EmailOutbox.next_attempt_at <= now)
+            .order_by(models.EmailOutbox.next_attempt_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )).all()
+        if not rows:
+            return 0
+        results = await asyncio.to_thread(_send_batch, mailer, limiter, [(r.id, r.to_email, r.subject, r.html_content) for r in rows])
+        now = datetime.utcnow()
+        for row in rows:
+            error = results[row.id]
+            row.attempts += 1
+            if error is None:
+                row.status = models.OutboxStatus.sent
+                row.sent_at = now
+                row.last_error = None
+            elif row.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+                row.status = models.OutboxStatus.failed
+                row.last_error = error
+                logger.error("giving up on email %s to %s: %s", row.id, row.to_email, error)
+            else:
+                row.last_error = error
+                row.next_attempt_at = now + timedelta(seconds=backoff_seconds(row.attempts))
+        await db.commit()
+        return len(rows)
+
+async def run():
+    mailer = SMTPMailer.from_settings()
+    limiter = RateLimiter(settings.EMAIL_RATE_LIMIT_PER_SECOND, settings.EMAIL_RATE_LIMIT_BURST)
+    try:
+        while True:
+            try:
+                claimed = await drain_once(mailer, limiter, settings.EMAIL_BATCH_SIZE)
+            except Exception:
+                logger.exception("email outbox drain failed")
+                claimed = 0
+            if claimed < settings.EMAIL_BATCH_SIZE:
+                await asyncio.sleep(settings.EMAIL_POLL_SECONDS)
+    finally:
+        mailer.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run())
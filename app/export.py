@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from enum import Enum
+from uuid import UUID
+from .config import settings
+from .db import SessionLocal
+
+FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+def _take(buffer: io.StringIO) -> str:
+    """Everything written to ``buffer`` since the last call, leaving it empty."""
+    value = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return value
+
+def _value(v):
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, Enum):
+        return v.value
+    if isinstance(v, UUID):
+        return str(v)
+    return v
+
+async def stream_rows(query, bind, batch_size: int = None):
+    """Yield lists of rows from ``query`` through a server-side cursor, ``batch_size`` at a time.
+
+    Uses its own session, so the stream is not tied to the request's dependency
+    session and only one batch is ever held in memory.
+    """
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    async with SessionLocal(bind=bind) as db:
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield partition
+
+async def encode(batches, columns, fmt: str):
+    """Render row batches as CSV (with a header line) or NDJSON, one string per batch."""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield _take(buffer)
+        async for rows in batches:
+            writer.writerows([map(_value, row) for row in rows])
+            yield _take(buffer)
+    else:
+        async for rows in batches:
+            yield "".join(json.dumps(dict(zip(columns, map(_value, row)))) + "\n" for row in rows)
+
+async def gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 -> gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+async def encoded(chunks):
+    async for chunk in chunks:
+        yield chunk.encode()
@@ -0,0 +1,91 @@
+from sqlalchemy import case, func, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models, response_cache
+from .config import settings
+from .search import is_postgres
+
+JOB_FACETS = ("location", "company", "status")
+
+def parse_facets(value: str):
+    """Requested facet names from ``facets=location,company``; "all" asks for every one. Raises ValueError."""
+    names = [n.strip() for n in (value or "").split(",") if n.strip()]
+    if names == ["all"]:
+        return list(JOB_FACETS)
+    unknown = [n for n in names if n not in JOB_FACETS]
+    if unknown:
+        raise ValueError(f"unknown facets {', '.join(unknown)}")
+    return [n for n in JOB_FACETS if n in names]
+
+def _top(entries: dict, name_field: str):
+    # most jobs first, ties by name; FACET_LIMIT bounds the response for long-tail locations
+    return sorted(entries.values(), key=lambda e: (-e["count"], e[name_field] or ""))[:settings.FACET_LIMIT]
+
+def _grouping_sets(query, names, columns, aggregates):
+    """Postgres: every facet from one GROUPING SETS scan, keeping the top FACET_LIMIT rows per facet."""
+    sets, facet = [], []
+    if "location" in names:
+        sets.append(tuple_(models.Job.location_normalized))
+        facet.append((func.grouping(models.Job.location_normalized) == 0, "location"))
+    if "company" in names:
+        sets.append(tuple_(models.Job.created_by, models.User.full_name))
+        facet.append((func.grouping(models.Job.created_by) == 0, "company"))
+    if "status" in names:
+        sets.append(tuple_(models.Job.status))
+        facet.append((func.grouping(models.Job.status) == 0, "status"))
+    facet = case(*facet)
+    # same order as _top, so the rows cut here are the ones it would drop
+    order = [func.count().desc()] + [c.asc().nulls_first() for c in columns if c is not models.Job.created_by]
+    rank = func.row_number().over(partition_by=facet, order_by=order)
+    ranked = (query.with_only_columns(*columns, *aggregates, facet.label("facet"), rank.label("rank"))
+              .group_by(func.grouping_sets(*sets)).order_by(None).subquery())
+    return select(ranked).where(or_(ranked.c.facet == "status", ranked.c.rank <= settings.FACET_LIMIT))
+
+async def job_facets(db: AsyncSession, query, names, filters: dict, use_cache: bool = True):
+    """Counts per location, company and/or status over the jobs ``query`` matches.
+
+    On postgres one GROUPING SETS query returns each facet's top rows; elsewhere one
+    GROUP BY over the requested dimensions together is rolled up per facet here.
+    Results are cached per filters until the next job write, unless ``use_cache`` is off.
+    """
+    key = await response_cache.jobs_facets.key({**filters, "facets": names}) if use_cache else None
+    cached = await response_cache.jobs_facets.get(key) if key else None
+    if cached is not None:
+        return cached
+    columns = []
+    if "location" in names:
+        columns += [models.Job.location_normalized]
+    if "company" in names:
+        columns += [models.Job.created_by, models.User.full_name]
+    if "status" in names:
+        columns += [models.Job.status]
+    aggregates = [func.count().label("count")]
+    if "location" in names:
+        # one of the original spellings, for display
+        aggregates.append(func.min(models.Job.location).label("location_label"))
+    grouping_sets = is_postgres(db)
+    if grouping_sets:
+        grouped = _grouping_sets(query, names, columns, aggregates)
+    else:
+        grouped = query.with_only_columns(*columns, *aggregates).group_by(*columns).order_by(None)
+    locations, companies, statuses = {}, {}, dict.fromkeys([s.value for s in models.JobStatus], 0)
+    for row in await db.execute(grouped):
+        # GROUPING SETS rows each belong to one facet; the fallback's rows count towards all of them
+        if "location" in names and (not grouping_sets or row.facet == "location"):
+            label = row.location_label.strip() if row.location_label else None
+            entry = locations.setdefault(row.location_normalized, {"value": row.location_normalized, "label": label, "count": 0})
+            entry["count"] += row.count
+        if "company" in names and (not grouping_sets or row.facet == "company"):
+            entry = companies.setdefault(str(row.created_by), {"id": str(row.created_by), "name": row.full_name, "count": 0})
+            entry["count"] += row.count
+        if "status" in names and (not grouping_sets or row.facet == "status") and row.status is not None:
+            statuses[row.status.value] += row.count
+    result = {}
+    if "location" in names:
+        result["location"] = _top(locations, "value")
+    if "company" in names:
+        result["company"] = _top(companies, "name")
+    if "status" in names:
+        result["status"] = [{"value": value, "count": count} for value, count in statuses.items()]
+    if key:
+        await response_cache.jobs_facets.set(key, result)
+    return result
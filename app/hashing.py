@@ -0,0 +1,93 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from passlib.context import CryptContext
+
+# one CryptContext per worker process and cost setting
+_contexts = {}
+
+def _context(rounds: int) -> CryptContext:
+    ctx = _contexts.get(rounds)
+    if ctx is None:
+        ctx = _contexts[rounds] = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+    return ctx
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+def _verify_and_update(password: str, hashed: str, rounds: int):
+    return _context(rounds).verify_and_update(password, hashed)
+
+class PasswordHasherBusy(Exception):
+    pass
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded process pool so hashing never holds the GIL of a web worker.
+
+    At most ``workers + max_pending`` calls may be in flight; past that, calls fail
+    fast with PasswordHasherBusy instead of queueing. ``workers=0`` hashes on a thread.
+    """
+
+    def __init__(self, rounds: int, workers: int, max_pending: int):
+        self.rounds = rounds
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self):
+        # spawned, not forked: a fork of the running server would copy its event loop,
+        # sockets and locks held by other threads into the workers
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _discard_executor(self, executor):
+        # a pool whose worker died is unusable; drop it so the next call starts a new one
+        with self._executor_lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _submit(self, fn, *args):
+        executor = self._get_executor()
+        try:
+            return await asyncio.wrap_future(executor.submit(fn, *args))
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            raise
+
+    async def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            if self.workers <= 0:
+                return await asyncio.to_thread(fn, *args)
+            try:
+                return await self._submit(fn, *args)
+            except BrokenProcessPool:
+                # retry once on a fresh pool; a second failure is not the pool's fault
+                return await self._submit(fn, *args)
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password, self.rounds)
+
+    async def verify_and_update(self, password: str, hashed: str):
+        """Return (valid, new_hash); new_hash is set when ``hashed`` uses an outdated cost."""
+        return await self._run(_verify_and_update, password, hashed, self.rounds)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+def default_workers() -> int:
+    return max((os.cpu_count() or 2) // 2, 1)
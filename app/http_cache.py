@@ -0,0 +1,63 @@
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+
+# conditional GET helpers: validators are computed from job versions, so a 304 skips serialization entirely
+
+def job_etag(job) -> str:
+    """Strong validator for a single job; changes whenever crud.update_job bumps the version."""
+    return f'"{job.id}-{job.version}"'
+
+def page_etag(jobs, *extra) -> str:
+    """Weak validator for a page of jobs: the ids and versions on it plus any paging metadata."""
+    digest = hashlib.sha1()
+    for job in jobs:
+        digest.update(f"{job.id}:{job.version};".encode())
+    for part in extra:
+        digest.update(f"{part};".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+def http_date(value) -> str:
+    # columns are naive timestamps; treat them as UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.replace(microsecond=0), usegmt=True)
+
+def _strip_weak(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+def is_not_modified(request: Request, etag: str, last_modified=None) -> bool:
+    """True if the client's cached copy is still current (If-None-Match wins over If-Modified-Since).
+
+    ``last_modified`` may be a datetime or an HTTP date string.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        if if_none_match.strip() == "*":
+            return True
+        # weak comparison, as GET conditionals allow
+        tags = {_strip_weak(t.strip()) for t in if_none_match.split(",")}
+        return _strip_weak(etag) in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if isinstance(last_modified, str):
+        last_modified = parsedate_to_datetime(last_modified)
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc)
+        return modified.replace(microsecond=0) <= since
+    return False
+
+def cache_headers(etag: str, cache_control: str, last_modified=None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,38 @@
+import csv
+import io
+import json
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def detect_format(content_type: str):
+    """Import format from a Content-Type header, or None if it isn't one we read."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in ("application/x-ndjson", "application/jsonl", "application/json-seq"):
+        return "ndjson"
+    if media_type in ("text/csv", "application/csv"):
+        return "csv"
+    return None
+
+def parse(text: str, fmt: str):
+    """Yield (line, fields, error) for each record; fields is a dict, or None when the line can't be read."""
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(text))
+        for record in reader:
+            if record.get(None):
+                yield reader.line_num, None, "more values than header columns"
+                continue
+            # empty cells are missing values, not empty strings
+            yield reader.line_num, {k: v if v != "" else None for k, v in record.items()}, None
+        return
+    for line, raw in enumerate(text.splitlines(), start=1):
+        if not raw.strip():
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError:
+            yield line, None, "invalid JSON"
+            continue
+        if not isinstance(record, dict):
+            yield line, None, "expected a JSON object"
+            continue
+        yield line, record, None
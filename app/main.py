@@ -1,16 +1,52 @@
-from fastapi import FastAPI
-from .db import Base, engine
+import hmac
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, Response
+from fastapi.responses import JSONResponse
+from . import db, response_cache, metrics
+from .config import Settings, configure, settings
+from .auth import shutdown_password_hasher
 from .routers import auth, jobs, applications
 
-# create tables at startup (for dev only; use alembic in prod)
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # schema is managed by alembic (`alembic upgrade head`), not created at startup;
+    # engines and pools are built here (no connection is opened) rather than at import
+    db.init_engines()
+    yield
+    shutdown_password_hasher()
+    await db.dispose_engines()
 
-app = FastAPI(title="Job Board API")
+def create_app(app_settings: Settings = None) -> FastAPI:
+    """Build the API. Without ``app_settings``, settings are read from the environment / .env."""
+    if app_settings is not None:
+        configure(app_settings)
+    app = FastAPI(title="Job Board API", lifespan=lifespan)
 
-@app.get("/")
-def home():
-  return {"Tite": "Job Application API"}
+    if settings.DATABASE_REPLICA_URLS:
+        app.add_middleware(db.WritePinMiddleware)
+    if settings.METRICS_ENABLED:
+        app.add_middleware(metrics.MetricsMiddleware)
+    if settings.METRICS_ENABLED and settings.METRICS_TOKEN:
+        @app.get("/metrics", include_in_schema=False)
+        async def prometheus_metrics(authorization: str = Header("")):
+            if not hmac.compare_digest(authorization.encode(), f"Bearer {settings.METRICS_TOKEN}".encode()):
+                response_data = {"success": False, "message": "Invalid metrics token", "object": None, "errors": ["send Authorization: Bearer <METRICS_TOKEN>"]}
+                return JSONResponse(status_code=401, content=response_data)
+            return Response(metrics.render(response_cache.metric_series()), media_type="text/plain; version=0.0.4")
 
-app.include_router(auth.router)
-app.include_router(jobs.router)
-app.include_router(applications.router)
+    @app.get("/")
+    async def home():
+      return {"Tite": "Job Application API"}
+
+    app.include_router(auth.router)
+    app.include_router(jobs.router)
+    app.include_router(applications.router)
+    return app
+
+def __getattr__(name):
+    # `uvicorn app.main:app` keeps working; the app is only built when something asks for it
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
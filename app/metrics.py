@@ -0,0 +1,175 @@
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from .config import settings
+
+# in-process request metrics rendered in the Prometheus text format; nothing here is registered unless METRICS_ENABLED
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = [(key, list(counts), total, n) for key, (counts, total, n) in self._series.items()]
+        for key, counts, total, n in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(key, le=bound)} {cumulative}"
+            yield f"{self.name}_bucket{_labels(key, le='+Inf')} {n}"
+            yield f"{self.name}_sum{_labels(key)} {total}"
+            yield f"{self.name}_count{_labels(key)} {n}"
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(key)} {value}"
+
+def _labels(key, **extra) -> str:
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pairs) + "}"
+
+request_latency = Histogram("http_request_duration_seconds", "Request latency by route.", LATENCY_BUCKETS)
+requests_total = Counter("http_requests_total", "Requests by route and status code.")
+request_statements = Histogram("db_statements_per_request", "SQL statements issued per request.", STATEMENT_BUCKETS)
+statements_total = Counter("db_statements_total", "SQL statements executed, by route.")
+statement_seconds = Counter("db_statement_seconds_total", "Time spent executing SQL, by route.")
+slow_statements = Counter("db_slow_statements_total", "Statements slower than SLOW_QUERY_MS, by route.")
+pool_wait = Histogram("db_pool_wait_seconds", "Time spent waiting for a pooled connection.", LATENCY_BUCKETS)
+
+class _RequestStats:
+    __slots__ = ("scope", "statements", "sql_seconds")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.statements = 0
+        self.sql_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        # filled in by the router once the request has been matched
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+_current = ContextVar("request_stats", default=None)
+
+class MetricsMiddleware:
+    """Times each HTTP request and tallies the SQL it issued, labelled by route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = _RequestStats(scope)
+        token = _current.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            route, method = stats.route, scope["method"]
+            request_latency.observe(elapsed, method=method, route=route)
+            requests_total.inc(method=method, route=route, status=status_code)
+            request_statements.observe(stats.statements, route=route)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current.get()
+    route = stats.route if stats is not None else "background"
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += elapsed
+    statements_total.inc(route=route)
+    statement_seconds.inc(elapsed, route=route)
+    if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        slow_statements.inc(route=route)
+        logger.warning("slow query (%.1f ms) on %s: %s", elapsed * 1000, route, " ".join(statement.split())[:1000])
+
+def instrument_engine(async_engine):
+    """Attach statement timing to an engine; routes are read from the current request's context."""
+    sync_engine = async_engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout took (waiting for a free slot, or opening a new connection)."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait.observe(time.perf_counter() - start)
+
+def render(extra=()) -> str:
+    """Prometheus text for every metric, plus ``extra`` (name, type, help, [(labels, value), ...]) series from elsewhere."""
+    lines = []
+    for metric in (request_latency, requests_total, request_statements, statements_total, statement_seconds, slow_statements, pool_wait):
+        lines.extend(metric.render())
+    for name, kind, help, samples in extra:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {value}")
+    return "\n".join(lines) + "\n"
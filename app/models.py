@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime, timedelta
-from sqlalchemy import Column, String, Integer, DateTime, Enum, ForeignKey, Text, func
+from sqlalchemy import Column, String, Integer, DateTime, Enum, ForeignKey, Text, UniqueConstraint, Index, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from .db import Base
@@ -15,6 +15,23 @@ class JobStatus(str, enum.Enum):
     Open = "Open"
     Closed = "Closed"
 
+# where a job may move from each status; enforced by PUT /api/jobs/{id} and by imports
+JOB_STATUS_TRANSITIONS = {
+    JobStatus.Draft: [JobStatus.Open],
+    JobStatus.Open: [JobStatus.Closed],
+    JobStatus.Closed: [],
+}
+
+class ResumeStatus(str, enum.Enum):
+    pending = "pending"
+    ready = "ready"
+    failed = "failed"
+
+class OutboxStatus(str, enum.Enum):
+    pending = "pending"
+    sent = "sent"
+    failed = "failed"
+
 class ApplicationStatus(str, enum.Enum):
     Applied = "Applied"
     Reviewed = "Reviewed"
@@ -37,23 +54,43 @@ class User(Base):
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_created_at_id", "created_at", "id"),
+        Index("ix_jobs_created_by", "created_by"),
+        Index("ix_jobs_location_normalized", "location_normalized"),
+        # bulk imports upsert on the integration's own id for the posting
+        UniqueConstraint("created_by", "external_id", name="uq_jobs_created_by_external_id"),
+    )
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(String(100), nullable=False)
     description = Column(Text, nullable=False)
     location = Column(String(200))
+    # utils.normalize_location(location), kept in step by crud; location filters and facets use it
+    location_normalized = Column(String(200))
     status = Column(Enum(JobStatus), default=JobStatus.Draft)
     created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    external_id = Column(String(255))
     created_at = Column(DateTime, default=func.now())
+    # bumped by crud.update_job; feeds the ETag / Last-Modified validators
+    updated_at = Column(DateTime, nullable=False, default=func.now(), server_default=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     owner = relationship("User", back_populates="jobs")
     applications = relationship("Application", back_populates="job")
 
 class Application(Base):
     __tablename__ = "applications"
+    __table_args__ = (
+        UniqueConstraint("applicant_id", "job_id", name="uq_applications_applicant_job"),
+        Index("ix_applications_job_status_applied", "job_id", "status", "applied_at"),
+        Index("ix_applications_applicant_applied", "applicant_id", "applied_at"),
+    )
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     applicant_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     job_id = Column(UUID(as_uuid=True), ForeignKey("jobs.id"), nullable=False)
     resume_link = Column(String(1024), nullable=False)
+    resume_status = Column(Enum(ResumeStatus), nullable=False, default=ResumeStatus.ready, server_default=ResumeStatus.ready.value)
+    resume_id = Column(UUID(as_uuid=True), ForeignKey("resumes.id"), nullable=True)
     cover_letter = Column(String(200))
     status = Column(Enum(ApplicationStatus), default=ApplicationStatus.Applied)
     applied_at = Column(DateTime, default=func.now())
@@ -61,9 +98,46 @@ class Application(Base):
     applicant = relationship("User", back_populates="applications")
     job = relationship("Job", back_populates="applications")
 
+class JobStatusCount(Base):
+    # applications per (job, status), maintained incrementally by crud; rebuilt by app.reconcile
+    __tablename__ = "job_status_counts"
+    job_id = Column(UUID(as_uuid=True), ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(Enum(ApplicationStatus), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class Resume(Base):
+    # one stored copy per distinct file an applicant uploads, addressed by content hash
+    __tablename__ = "resumes"
+    __table_args__ = (UniqueConstraint("applicant_id", "sha256", name="uq_resumes_applicant_sha256"),)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    applicant_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    url = Column(String(1024), nullable=False)
+    size = Column(Integer, nullable=False)
+    content_type = Column(String(200), nullable=False)
+    created_at = Column(DateTime, default=func.now())
+
 class EmailVerificationToken(Base):
     __tablename__ = "email_tokens"
     token = Column(String(128), primary_key=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     expires_at = Column(DateTime, nullable=False)
     created_at = Column(DateTime, default=func.now())
+
+class EmailOutbox(Base):
+    # written in the same transaction as the change that triggers the email; drained by app.email_worker
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # the worker's claim query: due pending rows, oldest first
+        Index("ix_email_outbox_pending_due", "next_attempt_at", postgresql_where=text("status = 'pending'")),
+    )
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    to_email = Column(String(256), nullable=False)
+    subject = Column(String(500), nullable=False)
+    html_content = Column(Text, nullable=False)
+    status = Column(Enum(OutboxStatus), nullable=False, default=OutboxStatus.pending, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=func.now())
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=func.now())
+    sent_at = Column(DateTime)
@@ -0,0 +1,20 @@
+"""Rebuild the per-job application status counters from the applications table.
+
+Run periodically (e.g. nightly cron) or after bulk data fixes: python -m app.reconcile
+"""
+import asyncio
+import logging
+from . import crud
+from .db import SessionLocal, dispose_engines
+
+logger = logging.getLogger(__name__)
+
+async def run():
+    async with SessionLocal() as db:
+        rows = await crud.reconcile_status_counts(db)
+    logger.info("rebuilt job_status_counts: %d rows", rows)
+    await dispose_engines()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run())
@@ -0,0 +1,181 @@
+import abc
+import functools
+import json
+import logging
+import threading
+import time
+from .cache import TTLCache
+from .config import on_configure, settings
+from .utils import normalize_params
+
+logger = logging.getLogger(__name__)
+
+class SharedCache(abc.ABC):
+    """A cache shared by every app process. Values are strings; ``incr`` backs the generation counters."""
+
+    @abc.abstractmethod
+    async def get(self, key: str):
+        ...
+
+    @abc.abstractmethod
+    async def set(self, key: str, value: str, ttl: float):
+        ...
+
+    @abc.abstractmethod
+    async def incr(self, key: str) -> int:
+        ...
+
+class InMemorySharedCache(SharedCache):
+    """Process-local stand-in for the shared tier, for tests and single-process dev."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    async def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+
+    async def incr(self, key):
+        with self._lock:
+            value = int(self._data.get(key, (0, None))[0]) + 1
+            self._data[key] = (value, None)
+            return value
+
+class RedisSharedCache(SharedCache):
+    def __init__(self, url: str):
+        # imported lazily so redis is only required when it is the configured shared tier
+        import redis.asyncio as redis
+        self._client = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key):
+        return await self._client.get(key)
+
+    async def set(self, key, value, ttl):
+        await self._client.set(key, value, ex=max(1, int(ttl)))
+
+    async def incr(self, key):
+        return await self._client.incr(key)
+
+def _shared_from_settings():
+    if not settings.RESPONSE_CACHE_SHARED:
+        return None
+    if settings.RESPONSE_CACHE_SHARED == "memory":
+        return InMemorySharedCache()
+    if settings.RESPONSE_CACHE_SHARED == "redis":
+        return RedisSharedCache(settings.REDIS_URL)
+    raise ValueError(f"unknown shared cache {settings.RESPONSE_CACHE_SHARED!r}")
+
+class ResponseCache:
+    """Two-tier cache of rendered responses for one namespace.
+
+    Keys combine the namespace's generation with normalized request params, so
+    ``invalidate`` orphans every entry at once and the TTL reclaims them. Values
+    must be JSON-serializable to go through the shared tier.
+    """
+
+    def __init__(self, namespace: str, maxsize: int, ttl: float, shared: SharedCache = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.shared = shared
+        self._generation = 0
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    async def _current_generation(self):
+        if self.shared is None:
+            return self._generation
+        try:
+            return int(await self.shared.get(f"{self.namespace}:generation") or 0)
+        except Exception:
+            logger.warning("shared cache unavailable, using the local tier only", exc_info=True)
+            return self._generation
+
+    async def key(self, params: dict):
+        return f"{self.namespace}:{await self._current_generation()}:{normalize_params(params)}"
+
+    async def get(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.shared is not None:
+            try:
+                raw = await self.shared.get(key)
+            except Exception:
+                logger.warning("shared cache get failed", exc_info=True)
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self.local.set(key, value)
+                self.shared_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            try:
+                await self.shared.set(key, json.dumps(value), self.ttl)
+            except Exception:
+                logger.warning("shared cache set failed", exc_info=True)
+
+    async def invalidate(self):
+        self._generation += 1
+        if self.shared is not None:
+            try:
+                await self.shared.incr(f"{self.namespace}:generation")
+            except Exception:
+                # other processes keep serving until their entries expire
+                logger.warning("shared cache invalidation failed", exc_info=True)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.local.evictions,
+            "size": len(self.local),
+        }
+
+@functools.cache
+def _jobs_browse():
+    return ResponseCache("jobs-browse", settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL_SECONDS, _shared_from_settings())
+
+@functools.cache
+def _jobs_facets():
+    return ResponseCache("jobs-facets", settings.FACET_CACHE_SIZE, settings.FACET_CACHE_TTL_SECONDS, _shared_from_settings())
+
+on_configure(_jobs_browse.cache_clear)
+on_configure(_jobs_facets.cache_clear)
+
+def __getattr__(name):
+    # rendered browse_jobs pages and browse facet counts (every job write in crud invalidates both), sized from settings on first use
+    if name == "jobs_browse":
+        return _jobs_browse()
+    if name == "jobs_facets":
+        return _jobs_facets()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def metric_series():
+    """Cache stats as (name, type, help, samples) for app.metrics.render."""
+    caches = [_jobs_browse(), _jobs_facets()]
+    series = []
+    for field, kind in (("hits", "counter"), ("shared_hits", "counter"), ("misses", "counter"), ("evictions", "counter"), ("size", "gauge")):
+        samples = [({"cache": c.namespace}, c.stats()[field]) for c in caches]
+        series.append((f"response_cache_{field}" + ("_total" if kind == "counter" else ""), kind, f"Response cache {field.replace('_', ' ')}.", samples))
+    return series
@@ -0,0 +1,15 @@
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+class ModelResponse(JSONResponse):
+    """Renders a pydantic model with pydantic-core's JSON serializer.
+
+    Returning this from a route skips FastAPI's response_model pass, so a page
+    that was already built from typed item models is not validated a second
+    time or walked by jsonable_encoder.
+    """
+
+    def render(self, content) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return super().render(content)
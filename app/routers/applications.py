@@ -1,59 +1,128 @@
-from fastapi import APIRouter, Depends, File, UploadFile, BackgroundTasks, Query, status
-from sqlalchemy.orm import Session
-from ..db import get_db
-from .. import crud, auth as auth_lib, models
-from ..schemas import BaseResponse, PaginatedResponse
-from ..cloudinary_utils import upload_resume_file
-from ..email_utils import send_email_background
+from fastapi import APIRouter, Depends, File, UploadFile, BackgroundTasks, Query, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..db import SessionLocal, get_db, get_read_db, read_bind
+from .. import crud, auth as auth_lib, models, counting, export
+from ..schemas import BaseResponse, PaginatedResponse, BulkApplicationStatusUpdate, MyApplicationOut, JobApplicationOut
+from ..responses import ModelResponse
+from ..storage import ResumeTooLarge, get_storage, spool_upload
+from ..email_utils import enqueue_email
 from ..config import settings
-import sqlalchemy
-from fastapi.responses import JSONResponse
+from ..utils import encode_cursor, keyset_filter, parse_uuid
+from fastapi.responses import JSONResponse, StreamingResponse
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/applications", tags=["applications"])
 
+def _notify_company(db, company_email, job_title, applicant_name, resume_link):
+    # queued in the session, so it commits with the application it announces
+    html = f"<p>New application for {job_title} from {applicant_name}. Resume: {resume_link}</p>"
+    enqueue_email(db, company_email, f"New applicant for {job_title}", html)
+
+async def _finalize_resume(application_id, applicant_id, spooled, key, notify_email, job_title, applicant_name):
+    """Background half of a deferred apply: upload the spooled resume, then mark the application."""
+    url = None
+    try:
+        url = await get_storage().save(spooled.chunks(), key, spooled.content_type)
+    except Exception:
+        logger.exception("deferred resume upload failed for application %s", application_id)
+    finally:
+        spooled.close()
+    async with SessionLocal() as db:
+        stored = await crud.save_resume(db, applicant_id, spooled.sha256, url, spooled.size, spooled.content_type) if url else None
+        if stored:
+            _notify_company(db, notify_email, job_title, applicant_name, stored.url)
+        await crud.set_resume_result(db, application_id, stored)
+
 # apply for job (applicant only)
 @router.post("/jobs/{job_id}/apply", response_model=BaseResponse)
-def apply_job(job_id: str, cover_letter: str = None, resume: UploadFile = File(...), background_tasks: BackgroundTasks = None,
-              db: Session = Depends(get_db), current_user = Depends(auth_lib.require_role("applicant"))):
+async def apply_job(job_id: str, cover_letter: str = None, resume: UploadFile = File(None), reuse_last_resume: bool = False, defer_upload: bool = False,
+              background_tasks: BackgroundTasks = None, db: AsyncSession = Depends(get_db), current_user = Depends(auth_lib.require_role("applicant"))):
     # check job exists
-    try:
-        job = crud.get_job(db, job_id)
-    except sqlalchemy.exc.DataError:
-        response_data = {"success": False, "message":"Job not found", "object": None, "errors": ["not found"]}
-        return JSONResponse(content=response_data, status_code=status.HTTP_404_NOT_FOUND)
+    job = await crud.get_job(db, job_id)
     if not job:
         return {"success": False, "message":"Job not found", "object": None, "errors": ["not found"]}
-    # duplicate check
-    existing = crud.get_application_by_applicant_job(db, current_user.id, job.id)
-    if existing:
-        return {"success": False, "message":"Already applied", "object": None, "errors": ["duplicate application"]}
-    # validate resume mime/type and extension
-    allowed = ["application/pdf", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]
-    if resume.content_type not in allowed:
-        return {"success": False, "message":"Unsupported file format", "object": None, "errors":["only pdf and docx allowed"]}
-    # upload resume to cloudinary
-    extension = resume.content_type[resume.content_type.index("/")+1:]
-    uploaded_url = upload_resume_file(resume.file, f"resume_{current_user.id}_{job.id}.{extension}")
-    app = crud.create_application(db, current_user.id, job.id, uploaded_url, cover_letter)
-    # send email to company
-    company = db.query(models.User).filter(models.User.id == job.created_by).first()
-    html = f"<p>New application for {job.title} from {current_user.full_name}. Resume: {uploaded_url}</p>"
-    send_email_background(background_tasks, company.email, f"New applicant for {job.title}", html)
-    return {"success": True, "message":"Applied successfully", "object": {"application_id": str(app.id)}, "errors": None}
+    too_large = {"success": False, "message": "Resume too large", "object": None, "errors": [f"resume must be at most {settings.RESUME_MAX_BYTES} bytes"]}
+    if resume is None:
+        if not reuse_last_resume:
+            return {"success": False, "message":"Resume required", "object": None, "errors": ["upload a resume or set reuse_last_resume"]}
+    else:
+        # validate resume mime/type and extension
+        allowed = ["application/pdf", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]
+        if resume.content_type not in allowed:
+            return {"success": False, "message":"Unsupported file format", "object": None, "errors":["only pdf and docx allowed"]}
+        if resume.size is not None and resume.size > settings.RESUME_MAX_BYTES:
+            return JSONResponse(content=too_large, status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    # duplicate check: claim the (applicant, job) pair before touching storage, so a repeat apply never uploads
+    application_id, created = await crud.claim_application(db, current_user.id, job.id, cover_letter)
+    if not created:
+        return {"success": False, "message":"Already applied", "object": {"application_id": str(application_id)}, "errors": ["duplicate application"]}
+    try:
+        company = await crud.get_user(db, job.created_by)
+        if resume is None:
+            stored = await crud.get_latest_resume(db, current_user.id)
+            if not stored:
+                await crud.release_application(db, application_id)
+                return {"success": False, "message":"No previous resume to reuse", "object": None, "errors": ["no stored resume"]}
+        else:
+            # hash locally first so a resume this applicant already stored is never uploaded again
+            try:
+                spooled = await spool_upload(resume, settings.RESUME_MAX_BYTES)
+            except ResumeTooLarge:
+                await crud.release_application(db, application_id)
+                return JSONResponse(content=too_large, status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            stored = await crud.get_resume_by_hash(db, current_user.id, spooled.sha256)
+            if stored:
+                spooled.close()
+            else:
+                extension = resume.content_type[resume.content_type.index("/")+1:]
+                key = f"resumes/{current_user.id}/{spooled.sha256}.{extension}"
+                if defer_upload:
+                    # the applicant sees the application now with a pending resume; the company once the upload finishes after the response
+                    background_tasks.add_task(_finalize_resume, application_id, current_user.id, spooled, key, company.email, job.title, current_user.full_name)
+                    return {"success": True, "message":"Application received, resume is processing", "object": {"application_id": str(application_id), "resume_status": models.ResumeStatus.pending.value}, "errors": None}
+                try:
+                    url = await get_storage().save(spooled.chunks(), key, spooled.content_type)
+                finally:
+                    spooled.close()
+                stored = await crud.save_resume(db, current_user.id, spooled.sha256, url, spooled.size, spooled.content_type)
+    except BaseException:
+        # includes cancellation (client gone, shutdown); a claim that outlives a crash is taken over after APPLICATION_CLAIM_TIMEOUT_SECONDS
+        await crud.release_application(db, application_id)
+        raise
+    # email to company
+    _notify_company(db, company.email, job.title, current_user.full_name, stored.url)
+    await crud.set_resume_result(db, application_id, stored)
+    return {"success": True, "message":"Applied successfully", "object": {"application_id": str(application_id)}, "errors": None}
 
 # track my applications (applicant)
-@router.get("/me", response_model=PaginatedResponse)
-def my_applications(page: int = 1, size: int = 10, company_name: str = None, job_status: str = None,
+@router.get("/me", response_model=PaginatedResponse[MyApplicationOut])
+async def my_applications(page: int = 1, size: int = 10, cursor: str = None, count: str = None, company_name: str = None, job_status: str = None,
                     app_status: list[str] = Query(None), sort_by: str = "applied_at", order: str = "desc",
-                    db: Session = Depends(get_db), current_user = Depends(auth_lib.require_role("applicant"))):
-    q = db.query(models.Application).join(models.Job).join(models.User, models.Job.created_by == models.User.id).filter(models.Application.applicant_id == current_user.id)
+                    db: AsyncSession = Depends(get_read_db), current_user = Depends(auth_lib.require_role("applicant"))):
+    # project only the serialized columns so rows don't lazy-load job/owner one by one
+    q = select(
+        models.Application.id,
+        models.Application.status,
+        models.Application.applied_at,
+        models.Job.title.label("job_title"),
+        models.User.full_name.label("company_name"),
+    ).join(models.Job, models.Application.job_id == models.Job.id).join(models.User, models.Job.created_by == models.User.id).filter(models.Application.applicant_id == current_user.id)
     if company_name:
         q = q.filter(models.User.full_name.ilike(f"%{company_name}%"))
     if job_status:
         q = q.filter(models.Job.status == models.JobStatus(job_status))
     if app_status:
         q = q.filter(models.Application.status.in_(app_status))
-    total = q.count()
+    try:
+        strategy = counting.resolve_strategy(count)
+    except ValueError:
+        response_data = {"success": False, "message": "Invalid count strategy", "object": None, "errors": [f"count must be one of {', '.join(counting.COUNT_STRATEGIES)}"]}
+        return JSONResponse(content=response_data, status_code=status.HTTP_400_BAD_REQUEST)
+    total, strategy = await counting.count_total(db, q, strategy, "applications", {
+        "applicant_id": current_user.id, "company_name": company_name, "job_status": job_status, "app_status": app_status})
     # sort
     ordering = {
         "applied_at": models.Application.applied_at,
@@ -62,75 +131,188 @@ def my_applications(page: int = 1, size: int = 10, company_name: str = None, job
         "job_title": models.Job.title,
         "application_id": models.Application.id
     }.get(sort_by, models.Application.applied_at)
-    if order.lower() == "desc":
-        ordering = ordering.desc()
+    descending = order.lower() == "desc"
+    # keyset cursors are keyed on (applied_at, id), so only that ordering can be resumed
+    keyed = ordering is models.Application.applied_at
+    if cursor and not keyed:
+        response_data = {"success": False, "message": "Cursor pagination is only supported when sorting by applied_at", "object": None, "errors": ["invalid cursor"]}
+        return JSONResponse(content=response_data, status_code=status.HTTP_400_BAD_REQUEST)
+    if descending:
+        q = q.order_by(ordering.desc(), models.Application.id.desc())
     else:
-        ordering = ordering.asc()
-    items = q.order_by(ordering).offset((page-1)*size).limit(size).all()
-    out = []
-    for a in items:
-        out.append({
-            "application_id": str(a.id),
-            "job_title": a.job.title,
-            "company_name": a.job.owner.full_name,
-            "status": a.status.value,
-            "applied_at": a.applied_at.isoformat()
-        })
-    return {"success": True, "message":"Applications fetched", "object": out, "pageNumber": page, "pageSize": size, "totalSize": total, "errors": None}
+        q = q.order_by(ordering.asc(), models.Application.id.asc())
+    if cursor:
+        try:
+            q = keyset_filter(q, models.Application.applied_at, models.Application.id, cursor, descending)
+        except ValueError:
+            response_data = {"success": False, "message": "Invalid cursor", "object": None, "errors": ["invalid cursor"]}
+            return JSONResponse(content=response_data, status_code=status.HTTP_400_BAD_REQUEST)
+    else:
+        q = q.offset((page-1)*size)
+    rows = (await db.execute(q.limit(size + 1))).all()
+    items = rows[:size]
+    has_more = len(rows) > size
+    next_cursor = encode_cursor(items[-1].applied_at, items[-1].id) if has_more and keyed else None
+    return ModelResponse(PaginatedResponse[MyApplicationOut](
+        success=True, message="Applications fetched", object=[MyApplicationOut.model_validate(a) for a in items],
+        pageNumber=page, pageSize=size, totalSize=total, countStrategy=strategy, hasMore=has_more, nextCursor=next_cursor,
+    ))
 
 # company: view job applications for job
-@router.get("/jobs/{job_id}", response_model=PaginatedResponse)
-def view_job_applications(job_id: str, status: str = None, page: int = 1, size: int = 10,
-                          db: Session = Depends(get_db), current_user = Depends(auth_lib.require_role("company"))):
-    job = crud.get_job(db, job_id)
+@router.get("/jobs/{job_id}", response_model=PaginatedResponse[JobApplicationOut])
+async def view_job_applications(job_id: str, status: str = None, page: int = 1, size: int = 10, cursor: str = None, count: str = None,
+                          db: AsyncSession = Depends(get_read_db), current_user = Depends(auth_lib.require_role("company"))):
+    job = await crud.get_job(db, job_id)
     if not job:
         return {"success": False, "message":"Job not found", "object": None, "errors": ["not found"]}
     if str(job.created_by) != str(current_user.id):
         return {"success": False, "message":"Unauthorized access", "object": None, "errors": ["unauthorized"]}
-    q = db.query(models.Application).filter(models.Application.job_id == job.id)
+    q = select(
+        models.Application.id,
+        models.Application.resume_link,
+        models.Application.resume_status,
+        models.Application.cover_letter,
+        models.Application.status,
+        models.Application.applied_at,
+        models.User.full_name.label("applicant_name"),
+    ).join(models.User, models.Application.applicant_id == models.User.id).filter(models.Application.job_id == job.id, crud.visible_to_company())
     if status:
         q = q.filter(models.Application.status == models.ApplicationStatus(status))
-    total = q.count()
-    items = q.order_by(models.Application.applied_at.desc()).offset((page-1)*size).limit(size).all()
-    out = []
-    for a in items:
-        out.append({
-            "applicant_name": a.applicant.full_name,
-            "resume_link": a.resume_link,
-            "cover_letter": a.cover_letter,
-            "status": a.status.value,
-            "applied_at": a.applied_at.isoformat(),
-            "application_id": a.id
-        })
-    return {"success": True, "message":"Applications fetched", "object": out, "pageNumber": page, "pageSize": size, "totalSize": total, "errors": None}
+    try:
+        strategy = counting.resolve_strategy(count)
+    except ValueError:
+        response_data = {"success": False, "message": "Invalid count strategy", "object": None, "errors": [f"count must be one of {', '.join(counting.COUNT_STRATEGIES)}"]}
+        return JSONResponse(content=response_data, status_code=400)
+    total, strategy = await counting.count_total(db, q, strategy, "applications", {"job_id": job.id, "status": status})
+    q = q.order_by(models.Application.applied_at.desc(), models.Application.id.desc())
+    if cursor:
+        try:
+            q = keyset_filter(q, models.Application.applied_at, models.Application.id, cursor)
+        except ValueError:
+            response_data = {"success": False, "message": "Invalid cursor", "object": None, "errors": ["invalid cursor"]}
+            return JSONResponse(content=response_data, status_code=400)
+    else:
+        q = q.offset((page-1)*size)
+    rows = (await db.execute(q.limit(size + 1))).all()
+    items = rows[:size]
+    has_more = len(rows) > size
+    next_cursor = encode_cursor(items[-1].applied_at, items[-1].id) if has_more else None
+    return ModelResponse(PaginatedResponse[JobApplicationOut](
+        success=True, message="Applications fetched", object=[JobApplicationOut.model_validate(a) for a in items],
+        pageNumber=page, pageSize=size, totalSize=total, countStrategy=strategy, hasMore=has_more, nextCursor=next_cursor,
+    ))
+
+# company: export every application for a job as csv or ndjson
+@router.get("/jobs/{job_id}/export")
+async def export_job_applications(job_id: str, request: Request, format: str = "csv", status: list[str] = Query(None),
+                                  db: AsyncSession = Depends(get_read_db), current_user = Depends(auth_lib.require_role("company"))):
+    job = await crud.get_job(db, job_id)
+    if not job:
+        return {"success": False, "message":"Job not found", "object": None, "errors": ["not found"]}
+    if str(job.created_by) != str(current_user.id):
+        return {"success": False, "message":"Unauthorized access", "object": None, "errors": ["unauthorized"]}
+    if format not in export.FORMATS:
+        response_data = {"success": False, "message": "Invalid format", "object": None, "errors": [f"format must be one of {', '.join(export.FORMATS)}"]}
+        return JSONResponse(content=response_data, status_code=400)
+    statuses = [s.value for s in models.ApplicationStatus]
+    if status and any(s not in statuses for s in status):
+        response_data = {"success": False, "message": "Invalid status", "object": None, "errors": [f"status must be one of {', '.join(statuses)}"]}
+        return JSONResponse(content=response_data, status_code=400)
+    columns = ["application_id", "applicant_name", "status", "resume_status", "resume_link", "cover_letter", "applied_at"]
+    q = select(
+        models.Application.id,
+        models.User.full_name,
+        models.Application.status,
+        models.Application.resume_status,
+        models.Application.resume_link,
+        models.Application.cover_letter,
+        models.Application.applied_at,
+    ).join(models.User, models.Application.applicant_id == models.User.id).filter(models.Application.job_id == job.id, crud.visible_to_company())
+    if status:
+        q = q.filter(models.Application.status.in_([models.ApplicationStatus(s) for s in status]))
+    # no COUNT and no OFFSET: one ordered scan, fetched EXPORT_BATCH_SIZE rows at a time
+    q = q.order_by(models.Application.applied_at.desc(), models.Application.id.desc())
+    chunks = export.encode(export.stream_rows(q, read_bind(request)), columns, format)
+    headers = {"Content-Disposition": f'attachment; filename="applications-{job.id}.{format}"', "Vary": "Accept-Encoding"}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        body = export.gzipped(chunks)
+    else:
+        body = export.encoded(chunks)
+    return StreamingResponse(body, media_type=export.FORMATS[format], headers=headers)
+
+def _status_email(new_status: str, job_title: str):
+    """(subject, body) to send the applicant for a status change, or None."""
+    if new_status == "Interview":
+        return (f"You've been selected for an interview for {job_title}",
+                f"Congrats! You've been invited to interview for {job_title}. Status: {new_status}")
+    if new_status == "Rejected":
+        return (f"Application update for {job_title}",
+                f"We regret to inform you that your application for {job_title} was {new_status}.")
+    if new_status == "Hired":
+        return (f"Congratulations! Hired for {job_title}",
+                f"Great news — your application for {job_title} resulted in {new_status}!")
+    return None
 
 # update application status (company)
 @router.patch("/{application_id}/status", response_model=BaseResponse)
-def update_application_status(application_id: str, payload: dict, background_tasks: BackgroundTasks, db: Session = Depends(get_db), current_user = Depends(auth_lib.require_role("company"))):
+async def update_application_status(application_id: str, payload: dict, db: AsyncSession = Depends(get_db), current_user = Depends(auth_lib.require_role("company"))):
     new_status = payload.get("new_status")
     if new_status not in [s.value for s in models.ApplicationStatus]:
         return {"success": False, "message":"Invalid status", "object": None, "errors": ["invalid status"]}
-    app = db.query(models.Application).filter(models.Application.id == application_id).first()
-    if not app:
+    found = await crud.get_application_with_job(db, application_id)
+    if not found:
         return {"success": False, "message":"Application not found", "object": None, "errors": ["not found"]}
-    job = db.query(models.Job).filter(models.Job.id == app.job_id).first()
+    app, job = found
     if str(job.created_by) != str(current_user.id):
         return {"success": False, "message":"Unauthorized", "object": None, "errors": ["unauthorized"]}
-    app.status = models.ApplicationStatus(new_status)
-    db.add(app)
-    db.commit()
-    db.refresh(app)
-    # email on certain statuses
-    if new_status in ["Interview", "Rejected", "Hired"]:
-        subj = ""
-        if new_status == "Interview":
-            subj = f"You've been selected for an interview for {job.title}"
-            body = f"Congrats! You've been invited to interview for {job.title}. Status: {new_status}"
-        elif new_status == "Rejected":
-            subj = f"Application update for {job.title}"
-            body = f"We regret to inform you that your application for {job.title} was {new_status}."
+    old_status = app.status
+    if not await crud.update_application_status(db, app, new_status, commit=False):
+        response_data = {"success": False, "message": "Application changed concurrently, retry", "object": None, "errors": ["changed concurrently, retry"]}
+        return JSONResponse(content=response_data, status_code=status.HTTP_409_CONFLICT)
+    # email on certain statuses, committed together with the status change
+    email = _status_email(new_status, job.title)
+    if email and old_status.value != new_status:
+        applicant = await crud.get_user(db, app.applicant_id)
+        enqueue_email(db, applicant.email, *email)
+    await db.commit()
+    return {"success": True, "message":"Application updated", "object": {"application_id": str(app.id), "status": new_status}, "errors": None}
+
+# bulk update application status (company)
+@router.patch("/status", response_model=BaseResponse)
+async def bulk_update_application_status(payload: BulkApplicationStatusUpdate, db: AsyncSession = Depends(get_db), current_user = Depends(auth_lib.require_role("company"))):
+    new_status = payload.new_status
+    if new_status not in [s.value for s in models.ApplicationStatus]:
+        return {"success": False, "message":"Invalid status", "object": None, "errors": ["invalid status"]}
+    results = {}
+    ids = []
+    for raw_id in payload.application_ids:
+        app_id = parse_uuid(raw_id)
+        if app_id is None:
+            results[raw_id] = "not found"
+        elif app_id not in ids:
+            ids.append(app_id)
+    # ownership, current status and applicant email for every id in one query
+    rows = {r.id: r for r in await crud.get_applications_for_update(db, ids)}
+    owned = []
+    for app_id in ids:
+        row = rows.get(app_id)
+        if not row:
+            results[str(app_id)] = "not found"
+        elif row.job_owner != current_user.id:
+            results[str(app_id)] = "unauthorized"
         else:
-            subj = f"Congratulations! Hired for {job.title}"
-            body = f"Great news — your application for {job.title} resulted in {new_status}!"
-        send_email_background(background_tasks, app.applicant.email, subj, body)
-    return {"success": True, "message":"Application updated", "object": {"application_id": str(app.id), "status": app.status.value}, "errors": None}
+            owned.append(app_id)
+    current = {app_id: (rows[app_id].job_id, rows[app_id].status) for app_id in owned}
+    updated = await crud.bulk_update_application_status(db, current, new_status, current_user.id, commit=False) if owned else set()
+    for app_id in owned:
+        row = rows[app_id]
+        email = _status_email(new_status, row.job_title)
+        if app_id in updated and email and row.status.value != new_status:
+            enqueue_email(db, row.applicant_email, *email)
+        results[str(app_id)] = None if app_id in updated else "changed concurrently, retry"
+    # status changes, counters and queued emails commit together
+    await db.commit()
+    items = [{"application_id": app_id, "success": error is None, "error": error} for app_id, error in results.items()]
+    errors = [f"{item['application_id']}: {item['error']}" for item in items if item["error"]]
+    return {"success": not errors, "message": f"{len(updated)} applications updated", "object": {"status": new_status, "updated": len(updated), "results": items}, "errors": errors or None}
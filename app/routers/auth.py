@@ -1,73 +1,98 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, status
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import schemas, crud, auth as auth_lib
 from ..db import get_db
-from ..email_utils import send_email_background
+from ..email_utils import enqueue_email
 from ..config import settings
-from ..models import RoleEnum, User
+from ..tokens import create_verification_token, read_verification_token
+from ..utils import parse_uuid
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 @router.post("/signup", response_model=schemas.BaseResponse)
-def signup(payload: schemas.SignupIn, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def signup(payload: schemas.SignupIn, db: AsyncSession = Depends(get_db)):
     # uniqueness
-    existing = crud.get_user_by_email(db, payload.email)
+    existing = await crud.get_user_by_email(db, payload.email)
     if existing:
         respone_data = {"success": False, "message": "Email already exists", "object": None, "errors": ["email already exists"]}
         return JSONResponse(content=respone_data, status_code=status.HTTP_409_CONFLICT)
-    password_hash = auth_lib.hash_password(payload.password)
-    user = crud.create_user(db, payload.full_name, payload.email, password_hash, payload.role)
-    token = crud.create_email_token(db, user.id)
+    password_hash = await auth_lib.hash_password(payload.password)
+    # user and verification email commit together; the token itself is signed, not stored
+    user = await crud.create_user(db, payload.full_name, payload.email, password_hash, payload.role, commit=False)
+    token = create_verification_token(user.id)
 
     # send verification email
-    # verify_link = f"{settings.FRONTEND_BASE_URL}/api/verify-email?token={token.token}"
-    html = f"<p>Hi {user.full_name}, here is your verification token {token.token}. Token expires in {settings.VERIFICATION_TOKEN_EXPIRE_MINUTES} minutes.</p>"
-    send_email_background(background_tasks, user.email, "Verify your email", html)
+    # verify_link = f"{settings.FRONTEND_BASE_URL}/api/verify-email?token={token}"
+    html = f"<p>Hi {user.full_name}, here is your verification token {token}. Token expires in {settings.VERIFICATION_TOKEN_EXPIRE_MINUTES} minutes.</p>"
+    enqueue_email(db, user.email, "Verify your email", html)
+    await db.commit()
     respone_data = {"success": True, "message": "Registered successfully. Verification email sent.", "object": {"user_id": str(user.id)}, "errors": None}
     return JSONResponse(content=respone_data, status_code=status.HTTP_201_CREATED)
 
-@router.get("/verify-email", response_model=schemas.BaseResponse)
-def verify_email(token: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    record = crud.get_token(db, token)
-    if not record:
+async def _resend_verification(db, user_id, legacy_token=None):
+    user = await crud.get_user(db, user_id)
+    if user and user.is_verified:
+        response_data = {"success": True, "message": "Email already verified", "object": {"user_id": str(user.id)}, "errors": None}
+        return JSONResponse(content=response_data, status_code=status.HTTP_200_OK)
+    if not user:
         response_data = {"success": False, "message":"Token invalid or malformed", "object": None, "errors": ["invalid token"]}
         return JSONResponse(content=response_data, status_code=status.HTTP_400_BAD_REQUEST)
-    
-    from datetime import datetime
-    if record.expires_at < datetime.utcnow():
-        # token expired -> generate new token and send email
-        new_token = crud.create_email_token(db, record.user_id)
-        user = db.query(User).filter(User.id == record.user_id).first()
-        # link = f"{settings.FRONTEND_BASE_URL}/api/verify-email?token={new_token.token}"
-        print(f"New_token:{token}")
-        html = f"<p>Your verification token expired. Use this new token {new_token} to verify.</p>"
-        send_email_background(background_tasks, user.email, "New verification link", html)
-        # delete old token
-        crud.delete_token(db, token)
-        response_data = {"success": False, "message": "Token expired. A new verification email was sent.", "object": None, "errors": ["token expired - new email sent"]}
-        return JSONResponse(content=response_data, status_code=status.HTTP_200_OK)
-    # token valid
-    user = db.query(User).filter(User.id == record.user_id).first()
-    if user.is_verified:
-        response_data = {"success": True, "message": "Email already verified", "object": {"user_id": str(user.id)}, "errors": None}
+    # token expired -> generate new token and send email
+    new_token = create_verification_token(user.id)
+    # link = f"{settings.FRONTEND_BASE_URL}/api/verify-email?token={new_token}"
+    html = f"<p>Your verification token expired. Use this new token {new_token} to verify.</p>"
+    enqueue_email(db, user.email, "New verification link", html)
+    if legacy_token:
+        await crud.delete_token(db, legacy_token, commit=False)
+    await db.commit()
+    response_data = {"success": False, "message": "Token expired. A new verification email was sent.", "object": None, "errors": ["token expired - new email sent"]}
+    return JSONResponse(content=response_data, status_code=status.HTTP_200_OK)
+
+@router.get("/verify-email", response_model=schemas.BaseResponse)
+async def verify_email(token: str, db: AsyncSession = Depends(get_db)):
+    state, user_id = read_verification_token(token)
+    user_id = parse_uuid(user_id) if user_id else None
+    legacy = None
+    if state == "invalid" or user_id is None:
+        # tokens issued before signed tokens live in email_tokens until they expire or are swept
+        legacy = await crud.get_token(db, token)
+        if not legacy:
+            response_data = {"success": False, "message":"Token invalid or malformed", "object": None, "errors": ["invalid token"]}
+            return JSONResponse(content=response_data, status_code=status.HTTP_400_BAD_REQUEST)
+        from datetime import datetime
+        user_id, state = legacy.user_id, ("expired" if legacy.expires_at < datetime.utcnow() else "valid")
+    if state == "expired":
+        return await _resend_verification(db, user_id, token if legacy else None)
+    # token valid: a single conditional UPDATE makes it one-time, later uses just see "already verified"
+    if legacy:
+        await crud.delete_token(db, token, commit=False)
+    if not await crud.mark_verified(db, user_id):
+        user = await crud.get_user(db, user_id)
+        if not user:
+            response_data = {"success": False, "message":"Token invalid or malformed", "object": None, "errors": ["invalid token"]}
+            return JSONResponse(content=response_data, status_code=status.HTTP_400_BAD_REQUEST)
+        response_data = {"success": True, "message": "Email already verified", "object": {"user_id": str(user_id)}, "errors": None}
         return JSONResponse(content=response_data, status_code=status.HTTP_200_OK)
-    user.is_verified = 1
-    db.add(user)
-    db.commit()
-    crud.delete_token(db, token)
-    response_data = {"success": True, "message": "Email verified successfully", "object": {"user_id": str(user.id)}, "errors": None}
+    auth_lib.invalidate_principal(user_id)
+    response_data = {"success": True, "message": "Email verified successfully", "object": {"user_id": str(user_id)}, "errors": None}
     return JSONResponse(content=response_data, status_code=status.HTTP_200_OK)
 
 @router.post("/login", response_model=schemas.BaseResponse)
-def login(payload: schemas.LoginIn, db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, payload.email)
+async def login(payload: schemas.LoginIn, db: AsyncSession = Depends(get_db)):
+    user = await crud.get_user_by_email(db, payload.email)
     if not user:
         response_data = {"success": False, "message":"Invalid credentials", "object": None, "errors":["invalid credentials"]}
         return JSONResponse(content=response_data, status_code=status.HTTP_404_NOT_FOUND)
-    if not auth_lib.verify_password(payload.password, user.password_hash):
+    valid, new_hash = await auth_lib.verify_password_and_update(payload.password, user.password_hash)
+    if not valid:
         response_data = {"success": False, "message":"Invalid credentials", "object": None, "errors":["invalid credentials"]}
         return JSONResponse(content=response_data, status_code=status.HTTP_404_NOT_FOUND)
+    # BCRYPT_ROUNDS changed since this hash was made; upgrade it while we have the plaintext
+    if new_hash:
+        user.password_hash = new_hash
+        db.add(user)
+        await db.commit()
     # create JWT
     token = auth_lib.create_access_token({"user_id": str(user.id), "role": user.role.value})
     return {"success": True, "message":"Login successful", "object":{"access_token": token, "token_type":"bearer"}, "errors": None}
@@ -1,35 +1,123 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import Optional, List
-from ..db import get_db
-from .. import schemas, crud, auth as auth_lib, models
+from fastapi import APIRouter, Depends, status, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import ValidationError
+from typing import Optional
+from ..db import get_db, get_read_db, pinned_to_primary
+from .. import schemas, crud, auth as auth_lib, models, counting
+from ..search import apply_job_search
+from ..utils import encode_cursor, keyset_filter, normalize_location
+from ..config import settings
+from .. import http_cache, response_cache, job_import, facets as job_facets
+from ..responses import ModelResponse
 from app.auth import get_current_user
 from fastapi.responses import JSONResponse
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/jobs", tags=["jobs"])
 
 # create job (company only)
 @router.post("/", response_model=schemas.BaseResponse)
-def create_job(payload: schemas.JobCreate, current_user=Depends(auth_lib.require_role("company")), db: Session = Depends(get_db)):
-    job = crud.create_job(db, current_user, payload.title, payload.description, payload.location, payload.status)
+async def create_job(payload: schemas.JobCreate, current_user=Depends(auth_lib.require_role("company")), db: AsyncSession = Depends(get_db)):
+    job = await crud.create_job(db, current_user, payload.title, payload.description, payload.location, payload.status)
     response_data = {"success": True, "message":"Job created", "object": {"id": str(job.id)}, "errors": None}
     return JSONResponse(content= response_data, status_code=status.HTTP_201_CREATED)
 
+# bulk import jobs from an ATS feed (company only): NDJSON or CSV, upserted by external_id
+@router.post("/import", response_model=schemas.BaseResponse)
+async def import_jobs(request: Request, format: Optional[str] = None, mode: Optional[str] = None,
+                      current_user=Depends(auth_lib.require_role("company")), db: AsyncSession = Depends(get_db)):
+    fmt = format or job_import.detect_format(request.headers.get("content-type"))
+    if fmt not in job_import.FORMATS:
+        response_data = {"success": False, "message": "Unsupported import format", "object": None, "errors": [f"send {' or '.join(job_import.FORMATS.values())}, or set format"]}
+        return JSONResponse(content=response_data, status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+    mode = mode or settings.JOB_IMPORT_MODE
+    if mode not in ("atomic", "chunked"):
+        response_data = {"success": False, "message": "Invalid import mode", "object": None, "errors": ["mode must be atomic or chunked"]}
+        return JSONResponse(content=response_data, status_code=status.HTTP_400_BAD_REQUEST)
+    too_large = {"success": False, "message": "Import too large", "object": None, "errors": [f"at most {settings.JOB_IMPORT_MAX_BYTES} bytes per import"]}
+    if int(request.headers.get("content-length") or 0) > settings.JOB_IMPORT_MAX_BYTES:
+        return JSONResponse(content=too_large, status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    # counted while reading, since the body may be chunked or lie about its length
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > settings.JOB_IMPORT_MAX_BYTES:
+            return JSONResponse(content=too_large, status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        response_data = {"success": False, "message": "Import must be UTF-8", "object": None, "errors": ["invalid encoding"]}
+        return JSONResponse(content=response_data, status_code=status.HTTP_400_BAD_REQUEST)
+
+    results, valid = {}, {}
+    for line, fields, error in job_import.parse(text, fmt):
+        if len(results) >= settings.JOB_IMPORT_MAX_ROWS:
+            response_data = {"success": False, "message": "Too many rows", "object": None, "errors": [f"at most {settings.JOB_IMPORT_MAX_ROWS} rows per import"]}
+            return JSONResponse(content=response_data, status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        results[line] = {"line": line, "external_id": (fields or {}).get("external_id"), "id": None, "action": None, "error": error}
+        if error:
+            continue
+        try:
+            row = schemas.JobImportRow.model_validate(fields)
+        except ValidationError as e:
+            results[line]["error"] = "; ".join(f"{'.'.join(map(str, err['loc'])) or 'row'}: {err['msg']}" for err in e.errors())
+            continue
+        # the last row for an external_id wins; one upsert statement can't touch the same job twice
+        key = row.external_id or ("line", line)
+        if key in valid:
+            results[valid[key][0]]["error"] = f"superseded by line {line} with the same external_id"
+        valid[key] = (line, row)
+
+    pending = sorted(valid.values(), key=lambda item: item[0])
+    batches = [pending[i:i + settings.JOB_IMPORT_BATCH_SIZE] for i in range(0, len(pending), settings.JOB_IMPORT_BATCH_SIZE)]
+    # one transaction for everything, or one per batch; a failed transaction fails only its own rows
+    transactions = [batches] if mode == "atomic" else [[batch] for batch in batches]
+    owner_id = current_user.id
+    written = False
+    for transaction in transactions:
+        saved = []
+        try:
+            for batch in transaction:
+                upserted = await crud.upsert_jobs(db, owner_id, [row for _, row in batch], commit=False)
+                saved += [(line, job_id, created) for (line, _), (job_id, created) in zip(batch, upserted)]
+            await db.commit()
+        except Exception:
+            logger.exception("job import failed for company %s", owner_id)
+            await db.rollback()
+            for batch in transaction:
+                for line, _ in batch:
+                    results[line]["error"] = "could not be saved"
+            continue
+        written = True
+        for line, job_id, created in saved:
+            if job_id is None:
+                results[line]["error"] = "invalid status transition"
+            else:
+                results[line].update(id=str(job_id), action="created" if created else "updated")
+    if written:
+        await crud.jobs_changed()
+
+    items = list(results.values())
+    created = sum(r["action"] == "created" for r in items)
+    updated = sum(r["action"] == "updated" for r in items)
+    errors = [f"line {r['line']}: {r['error']}" for r in items if r["error"]]
+    return {"success": not errors, "message": f"{created} jobs created, {updated} updated, {len(errors)} failed",
+            "object": {"mode": mode, "created": created, "updated": updated, "failed": len(errors), "results": items}, "errors": errors or None}
+
 # update job
 @router.put("/{job_id}", response_model=schemas.BaseResponse)
-def update_job(job_id: str, payload: schemas.JobUpdate, current_user=Depends(auth_lib.require_role("company")), db: Session = Depends(get_db)):
-    job = crud.get_job(db, job_id)
+async def update_job(job_id: str, payload: schemas.JobUpdate, current_user=Depends(auth_lib.require_role("company")), db: AsyncSession = Depends(get_db)):
+    job = await crud.get_job(db, job_id)
     if not job:
         return {"success": False, "message":"Job not found", "object": None, "errors": ["not found"]}
     if str(job.created_by) != str(current_user.id):
         return {"success": False, "message":"Unauthorized access", "object": None, "errors": ["unauthorized"]}
     # status transition enforcement
     if payload.status:
-        allowed = {
-            models.JobStatus.Draft: [models.JobStatus.Open],
-            models.JobStatus.Open: [models.JobStatus.Closed],
-            models.JobStatus.Closed: []
-        }
+        allowed = models.JOB_STATUS_TRANSITIONS
         current_status = job.status
         new_status = models.JobStatus(payload.status)
         if new_status == current_status:
@@ -38,57 +126,118 @@ def update_job(job_id: str, payload: schemas.JobUpdate, current_user=Depends(aut
             if new_status not in allowed[current_status]:
                 return {"success": False, "message":"Invalid status transition", "object": None, "errors": ["invalid status transition"]}
     updates = {k:v for k,v in payload.dict().items() if v is not None}
-    job = crud.update_job(db, job, **updates)
+    job = await crud.update_job(db, job, **updates)
     return {"success": True, "message": "Job updated", "object": {"id": str(job.id)}, "errors": None}
 
 @router.delete("/{job_id}", response_model=schemas.BaseResponse)
-def delete_job(job_id: str, current_user=Depends(auth_lib.require_role("company")), db: Session = Depends(get_db)):
-    job = crud.get_job(db, job_id)
+async def delete_job(job_id: str, current_user=Depends(auth_lib.require_role("company")), db: AsyncSession = Depends(get_db)):
+    job = await crud.get_job(db, job_id)
     if not job:
         return {"success": False, "message":"Job not found", "object": None, "errors": ["not found"]}
     if str(job.created_by) != str(current_user.id):
         return {"success": False, "message":"Unauthorized access", "object": None, "errors": ["unauthorized"]}
-    crud.delete_job(db, job)
+    await crud.delete_job(db, job)
     return {"success": True, "message":"Job deleted", "object": None, "errors": None}
 
+# company dashboard: applicants per status for each of the company's jobs, from the counter table
+# (declared before /{job_id} so "dashboard" isn't taken for a job id)
+@router.get("/dashboard", response_model=schemas.BaseResponse)
+async def job_dashboard(current_user=Depends(auth_lib.require_role("company")), db: AsyncSession = Depends(get_read_db)):
+    statuses = [s.value for s in models.ApplicationStatus]
+    jobs, totals = {}, dict.fromkeys(statuses, 0)
+    for row in await crud.get_dashboard_counts(db, current_user.id):
+        job = jobs.get(row.id)
+        if job is None:
+            job = jobs[row.id] = {"job_id": str(row.id), "title": row.title, "job_status": row.status.value, "counts": dict.fromkeys(statuses, 0), "total": 0}
+        if row.application_status is not None:
+            job["counts"][row.application_status.value] += row.count
+            job["total"] += row.count
+            totals[row.application_status.value] += row.count
+    return {"success": True, "message": "Dashboard fetched", "object": {"jobs": list(jobs.values()), "totals": totals, "total": sum(totals.values())}, "errors": None}
+
 # browse jobs - accessible to all authenticated users
-@router.get("/", response_model=schemas.PaginatedResponse)
-def browse_jobs(q_title: Optional[str] = Query(None), q_location: Optional[str] = Query(None), company_name: Optional[str] = Query(None),
-                page: int = 1, size: int = 10, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    query = db.query(models.Job).join(models.User, models.Job.created_by == models.User.id)
+@router.get("/", response_model=schemas.JobBrowseResponse)
+async def browse_jobs(request: Request, q: Optional[str] = Query(None), q_title: Optional[str] = Query(None), q_location: Optional[str] = Query(None), company_name: Optional[str] = Query(None),
+                location: Optional[str] = Query(None), facets: Optional[str] = Query(None),
+                page: int = 1, size: int = 10, cursor: Optional[str] = Query(None), count: Optional[str] = Query(None), db: AsyncSession = Depends(get_read_db), current_user=Depends(get_current_user)):
+    # rendered pages are shared by every caller with the same params until a job write invalidates them;
+    # a caller who just wrote skips them, since a replica read may have refilled them with pre-write rows
+    use_cache = not pinned_to_primary(request)
+    cache_key = None
+    if settings.RESPONSE_CACHE_ENABLED and use_cache:
+        cache_key = await response_cache.jobs_browse.key({"q": q, "q_title": q_title, "q_location": q_location, "company_name": company_name, "location": location,
+                                                          "facets": facets, "page": page, "size": size, "cursor": cursor, "count": count})
+        cached = await response_cache.jobs_browse.get(cache_key)
+        if cached:
+            body, headers = cached
+            if http_cache.is_not_modified(request, headers["ETag"]):
+                return http_cache.not_modified(headers)
+            return Response(content=body, media_type="application/json", headers=headers)
+    try:
+        facet_names = job_facets.parse_facets(facets)
+    except ValueError as e:
+        response_data = {"success": False, "message": "Invalid facets", "object": None, "errors": [f"{e}; facets must be from {', '.join(job_facets.JOB_FACETS)} or all"]}
+        return JSONResponse(content=response_data, status_code=status.HTTP_400_BAD_REQUEST)
+    query = select(models.Job).join(models.User, models.Job.created_by == models.User.id)
     if q_title:
         query = query.filter(models.Job.title.ilike(f"%{q_title}%"))
+    # locations are matched on the normalized column: exact (btree) for a facet value, substring (trigram index on postgres) for q_location
+    if location:
+        query = query.filter(models.Job.location_normalized == normalize_location(location))
     if q_location:
-        query = query.filter(models.Job.location.ilike(f"%{q_location}%"))
+        query = query.filter(models.Job.location_normalized.contains(normalize_location(q_location) or "", autoescape=True))
     if company_name:
         query = query.filter(models.User.full_name.ilike(f"%{company_name}%"))
-    total = query.count()
-    items = query.order_by(models.Job.created_at.desc()).offset((page-1)*size).limit(size).all()
-    out = []
-    for j in items:
-        out.append({
-            "id": str(j.id),
-            "title": j.title,
-            "description": j.description,
-            "location": j.location,
-            "status": j.status.value,
-            "created_by": str(j.created_by),
-            "created_at": j.created_at.isoformat()
-        })
-    return {"success": True, "message":"Jobs fetched", "object": out, "pageNumber": page, "pageSize": size, "totalSize": total, "errors": None}
+    # free-text search across title/description/location, ranked by relevance
+    if q:
+        if cursor:
+            response_data = {"success": False, "message": "Cursor pagination is not supported for ranked search", "object": None, "errors": ["invalid cursor"]}
+            return JSONResponse(content=response_data, status_code=status.HTTP_400_BAD_REQUEST)
+        query = apply_job_search(query, db, q)
+    else:
+        query = query.order_by(models.Job.created_at.desc(), models.Job.id.desc())
+    try:
+        strategy = counting.resolve_strategy(count)
+    except ValueError:
+        response_data = {"success": False, "message": "Invalid count strategy", "object": None, "errors": [f"count must be one of {', '.join(counting.COUNT_STRATEGIES)}"]}
+        return JSONResponse(content=response_data, status_code=status.HTTP_400_BAD_REQUEST)
+    filters = {"q": q, "q_title": q_title, "q_location": q_location, "company_name": company_name, "location": location}
+    total, strategy = await counting.count_total(db, query, strategy, "jobs", filters)
+    facet_counts = await job_facets.job_facets(db, query, facet_names, filters, use_cache) if facet_names else None
+    # cursor takes precedence over page; page/size clients keep the offset path
+    if cursor:
+        try:
+            query = keyset_filter(query, models.Job.created_at, models.Job.id, cursor)
+        except ValueError:
+            response_data = {"success": False, "message": "Invalid cursor", "object": None, "errors": ["invalid cursor"]}
+            return JSONResponse(content=response_data, status_code=status.HTTP_400_BAD_REQUEST)
+    else:
+        query = query.offset((page-1)*size)
+    rows = (await db.scalars(query.limit(size + 1))).all()
+    items = rows[:size]
+    has_more = len(rows) > size
+    next_cursor = encode_cursor(items[-1].created_at, items[-1].id) if has_more and not q else None
+    # weak validator over what is on the page; a match skips serializing it
+    etag = http_cache.page_etag(items, page, size, total, strategy, has_more, next_cursor, facet_counts)
+    # no Last-Modified: the newest updated_at on a page doesn't move when a job is deleted or rows shift pages
+    headers = http_cache.cache_headers(etag, settings.CACHE_CONTROL_JOB_BROWSE)
+    if http_cache.is_not_modified(request, etag):
+        return http_cache.not_modified(headers)
+    body = schemas.JobBrowseResponse(
+        success=True, message="Jobs fetched", object=[schemas.JobOut.model_validate(j) for j in items],
+        pageNumber=page, pageSize=size, totalSize=total, countStrategy=strategy, hasMore=has_more, nextCursor=next_cursor, facets=facet_counts,
+    ).model_dump_json()
+    if cache_key:
+        await response_cache.jobs_browse.set(cache_key, [body, headers])
+    return Response(content=body, media_type="application/json", headers=headers)
 
 # view job detail
-@router.get("/{job_id}", response_model=schemas.BaseResponse)
-def job_detail(job_id: str, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    job = crud.get_job(db, job_id)
+@router.get("/{job_id}", response_model=schemas.JobResponse)
+async def job_detail(job_id: str, request: Request, db: AsyncSession = Depends(get_read_db), current_user=Depends(get_current_user)):
+    job = await crud.get_job(db, job_id)
     if not job:
         return {"success": False, "message":"Job not found", "object": None, "errors": ["not found"]}
-    return {"success": True, "message":"Job fetched", "object": {
-        "id": str(job.id),
-        "title": job.title,
-        "description": job.description,
-        "location": job.location,
-        "status": job.status.value,
-        "created_by": str(job.created_by),
-        "created_at": job.created_at.isoformat()
-    }, "errors": None}
+    headers = http_cache.cache_headers(http_cache.job_etag(job), settings.CACHE_CONTROL_JOB_DETAIL, job.updated_at)
+    if http_cache.is_not_modified(request, headers["ETag"], job.updated_at):
+        return http_cache.not_modified(headers)
+    return ModelResponse(schemas.JobResponse(success=True, message="Job fetched", object=schemas.JobOut.model_validate(job)), headers=headers)
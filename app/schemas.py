@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field, field_validator
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
+from typing import Generic, Optional, List, TypeVar
 from uuid import UUID
 from datetime import datetime
 from enum import Enum
@@ -10,13 +10,18 @@ class BaseResponse(BaseModel):
     object: Optional[dict] = None
     errors: Optional[List[str]] = None
 
-class PaginatedResponse(BaseModel):
+T = TypeVar("T")
+
+class PaginatedResponse(BaseModel, Generic[T]):
     success: bool
     message: str
-    object: List[dict]
+    object: List[T]
     pageNumber: int
     pageSize: int
-    totalSize: int
+    totalSize: Optional[int] = None
+    countStrategy: str = "exact"
+    hasMore: bool = False
+    nextCursor: Optional[str] = None
     errors: Optional[List[str]] = None
 
 # input schemas
@@ -53,6 +58,17 @@ class JobCreate(BaseModel):
     location: Optional[str] = None
     status: Optional[str] = None
 
+class JobImportRow(JobCreate):
+    # the integration's own id for the posting; re-importing it updates the job instead of duplicating it
+    external_id: Optional[str] = Field(None, min_length=1, max_length=255)
+
+    @field_validator("status")
+    def known_status(cls, v):
+        statuses = ["Draft", "Open", "Closed"]
+        if v is not None and v not in statuses:
+            raise ValueError(f"status must be one of {', '.join(statuses)}")
+        return v
+
 class JobUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=1, max_length=100)
     description: Optional[str] = Field(None, min_length=20, max_length=2000)
@@ -65,8 +81,14 @@ class ApplicationCreate(BaseModel):
 class ApplicationStatusUpdate(BaseModel):
     new_status: str
 
+class BulkApplicationStatusUpdate(BaseModel):
+    application_ids: List[str] = Field(..., min_length=1, max_length=500)
+    new_status: str
+
 # response schemas (simplified)
+# item models are built straight from ORM objects / projected rows (from_attributes)
 class JobOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
     id: UUID
     title: str
     description: str
@@ -75,6 +97,10 @@ class JobOut(BaseModel):
     created_by: UUID
     created_at: datetime
 
+class JobBrowseResponse(PaginatedResponse[JobOut]):
+    # {"location": [{value, label, count}], "company": [{id, name, count}], "status": [{value, count}]} when facets= is set
+    facets: Optional[dict] = None
+
 class ApplicationOut(BaseModel):
     id: UUID
     job_id: UUID
@@ -83,3 +109,24 @@ class ApplicationOut(BaseModel):
     cover_letter: Optional[str]
     status: str
     applied_at: datetime
+
+class JobResponse(BaseResponse):
+    object: Optional[JobOut] = None
+
+class MyApplicationOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    application_id: UUID = Field(validation_alias="id")
+    job_title: str
+    company_name: str
+    status: str
+    applied_at: datetime
+
+class JobApplicationOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    applicant_name: str
+    resume_link: str
+    resume_status: str
+    cover_letter: Optional[str]
+    status: str
+    applied_at: datetime
+    application_id: UUID = Field(validation_alias="id")
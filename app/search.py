@@ -0,0 +1,31 @@
+from sqlalchemy import func, literal_column, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+
+SEARCH_CONFIG = "english"
+
+# generated tsvector column maintained by postgres (see alembic revision 3b9c1d7e5a21);
+# it is not mapped on models.Job so sqlite test databases can still create_all
+job_search_vector = literal_column("jobs.search_vector")
+
+def is_postgres(db: AsyncSession) -> bool:
+    return db.bind.dialect.name == "postgresql"
+
+def apply_job_search(query, db: AsyncSession, text: str):
+    """Filter a Job select by a free-text search and order it by relevance.
+
+    On postgres this uses the GIN-indexed ``search_vector`` column and ranks with
+    ts_rank_cd. Other databases fall back to a substring match ordered by recency.
+    Ties break on id so OFFSET pages never repeat or skip a job.
+    """
+    if is_postgres(db):
+        ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, text)
+        rank = func.ts_rank_cd(job_search_vector, ts_query)
+        return query.filter(job_search_vector.op("@@")(ts_query)).order_by(rank.desc(), models.Job.created_at.desc(), models.Job.id.desc())
+    pattern = f"%{text}%"
+    query = query.filter(or_(
+        models.Job.title.ilike(pattern),
+        models.Job.description.ilike(pattern),
+        models.Job.location.ilike(pattern),
+    ))
+    return query.order_by(models.Job.created_at.desc(), models.Job.id.desc())
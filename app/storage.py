@@ -0,0 +1,117 @@
+import abc
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from starlette.concurrency import run_in_threadpool
+from .config import on_configure, settings
+
+CHUNK_SIZE = 1024 * 1024
+
+class ResumeTooLarge(Exception):
+    pass
+
+class SpooledUpload:
+    """An upload copied to a local temp file, so it can outlive the request."""
+    __slots__ = ("file", "sha256", "size", "content_type")
+
+    def __init__(self, file, sha256, size, content_type):
+        self.file = file
+        self.sha256 = sha256
+        self.size = size
+        self.content_type = content_type
+
+    async def chunks(self):
+        await run_in_threadpool(self.file.seek, 0)
+        while chunk := await run_in_threadpool(self.file.read, CHUNK_SIZE):
+            yield chunk
+
+    def close(self):
+        self.file.close()
+
+class StorageBackend(abc.ABC):
+    @abc.abstractmethod
+    async def save(self, chunks, key: str, content_type: str) -> str:
+        """Consume an async iterator of bytes, store it under ``key`` and return its URL."""
+
+class LocalStorage(StorageBackend):
+    """Writes files under a directory; for development and tests."""
+
+    def __init__(self, root: str, base_url: str = None):
+        self.root = Path(root).resolve()
+        self.base_url = base_url
+
+    async def save(self, chunks, key, content_type):
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in chunks:
+                    await run_in_threadpool(f.write, chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        if self.base_url:
+            return self.base_url.rstrip("/") + "/" + key
+        return path.as_uri()
+
+class CloudinaryStorage(StorageBackend):
+    """Cloudinary's SDK wants a file object, so chunks are spooled locally then sent with upload_large."""
+
+    async def save(self, chunks, key, content_type):
+        from .cloudinary_utils import upload_resume_file
+        with tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE) as spool:
+            async for chunk in chunks:
+                await run_in_threadpool(spool.write, chunk)
+            await run_in_threadpool(spool.seek, 0)
+            return await run_in_threadpool(upload_resume_file, spool, key)
+
+_backend = None
+
+def get_storage() -> StorageBackend:
+    global _backend
+    if _backend is None:
+        if settings.STORAGE_BACKEND == "local":
+            _backend = LocalStorage(settings.LOCAL_STORAGE_DIR, settings.LOCAL_STORAGE_BASE_URL)
+        elif settings.STORAGE_BACKEND == "cloudinary":
+            _backend = CloudinaryStorage()
+        else:
+            raise ValueError(f"unknown storage backend {settings.STORAGE_BACKEND!r}")
+    return _backend
+
+def _reset_storage():
+    global _backend
+    _backend = None
+
+on_configure(_reset_storage)
+
+class _LimitedReader:
+    """Reads an UploadFile in chunks, hashing it and failing once it exceeds ``max_bytes``."""
+
+    def __init__(self, upload, max_bytes: int):
+        self.upload = upload
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hasher = hashlib.sha256()
+
+    async def chunks(self):
+        while chunk := await self.upload.read(CHUNK_SIZE):
+            self.size += len(chunk)
+            if self.size > self.max_bytes:
+                raise ResumeTooLarge()
+            self.hasher.update(chunk)
+            yield chunk
+
+async def spool_upload(upload, max_bytes: int) -> SpooledUpload:
+    """Copy ``upload`` to a temp file we own, hashing and enforcing ``max_bytes`` on the way."""
+    reader = _LimitedReader(upload, max_bytes)
+    spool = tempfile.TemporaryFile()
+    try:
+        async for chunk in reader.chunks():
+            await run_in_threadpool(spool.write, chunk)
+    except BaseException:
+        spool.close()
+        raise
+    return SpooledUpload(spool, reader.hasher.hexdigest(), reader.size, upload.content_type)
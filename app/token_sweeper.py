@@ -0,0 +1,41 @@
+"""Deletes expired or already-used legacy email verification tokens in small batches.
+
+Verification tokens are signed now and never stored, so this only drains rows
+issued before that change. Run until the table is empty (--once drains and
+exits), after which email_tokens can be dropped: python -m app.token_sweeper
+"""
+import argparse
+import asyncio
+import logging
+from . import crud
+from .config import settings
+from .db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+async def sweep_once(batch_size: int) -> int:
+    """Delete stale tokens batch by batch (one short transaction each) until none are left."""
+    total = 0
+    async with SessionLocal() as db:
+        while True:
+            deleted = await crud.delete_stale_tokens(db, batch_size)
+            total += deleted
+            if deleted < batch_size:
+                return total
+
+async def run(once: bool = False):
+    while True:
+        try:
+            deleted = await sweep_once(settings.TOKEN_SWEEP_BATCH_SIZE)
+            logger.info("swept %d stale verification tokens", deleted)
+        except Exception:
+            logger.exception("verification token sweep failed")
+        if once:
+            return
+        await asyncio.sleep(settings.TOKEN_SWEEP_INTERVAL_SECONDS)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep stale email verification tokens")
+    parser.add_argument("--once", action="store_true", help="drain once and exit instead of looping")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(parser.parse_args().once))
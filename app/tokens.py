@@ -0,0 +1,72 @@
+import functools
+from datetime import datetime, timedelta
+from jose import jwt, JWTError
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from .config import on_configure, settings
+
+# email verification tokens are signed and time-stamped, so checking one needs no table lookup
+@functools.cache
+def _verification():
+    return URLSafeTimedSerializer(settings.SECRET_KEY, salt="email-verification")
+
+on_configure(_verification.cache_clear)
+
+# read-your-writes pin (see db.pinned_to_primary): the client carries it, so any process or instance honours it
+WRITE_PIN_COOKIE = "write_pin"
+
+@functools.cache
+def _write_pins():
+    return URLSafeTimedSerializer(settings.SECRET_KEY, salt="read-your-writes")
+
+on_configure(_write_pins.cache_clear)
+
+def create_write_pin(subject: str) -> str:
+    return _write_pins().dumps(subject)
+
+def read_write_pin(value: str, subject: str) -> bool:
+    """True if ``value`` pins ``subject`` and is younger than READ_YOUR_WRITES_SECONDS."""
+    if not value:
+        return False
+    try:
+        return _write_pins().loads(value, max_age=settings.READ_YOUR_WRITES_SECONDS) == subject
+    except BadSignature:
+        return False
+
+def create_access_token(data: dict, expires_minutes: int = None):
+    to_encode = data.copy()
+    expire = datetime.utcnow() + timedelta(minutes=(expires_minutes or settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode.update({"exp": expire})
+    encoded = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
+    return encoded
+
+def decode_access_token(token: str):
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        return payload
+    except JWTError:
+        return None
+
+def request_subject(request):
+    """user_id of the bearer token on ``request``, or None; no database access."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    payload = decode_access_token(token)
+    return payload.get("user_id") if payload else None
+
+def create_verification_token(user_id) -> str:
+    return _verification().dumps({"user_id": str(user_id)})
+
+def read_verification_token(token: str):
+    """Return (state, user_id) where state is "valid", "expired" or "invalid" (user_id is None when invalid)."""
+    try:
+        payload = _verification().loads(token, max_age=settings.VERIFICATION_TOKEN_EXPIRE_MINUTES * 60)
+        return "valid", payload.get("user_id")
+    except SignatureExpired as e:
+        # signature checked out, only the age is wrong; still tells us who to re-send to
+        try:
+            return "expired", _verification().load_payload(e.payload).get("user_id")
+        except BadSignature:
+            return "invalid", None
+    except BadSignature:
+        return "invalid", None
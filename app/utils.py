@@ -0,0 +1,62 @@
+import base64
+import json
+from datetime import datetime
+from uuid import UUID
+from sqlalchemy import tuple_
+
+def parse_uuid(value):
+    """Return ``value`` as a UUID, or None if it is not one."""
+    if isinstance(value, UUID):
+        return value
+    try:
+        return UUID(str(value))
+    except ValueError:
+        return None
+
+def normalize_location(value):
+    """Canonical form of a job location for filtering and facets; matches the lower(trim()) backfill in migration b5d3f8a1c602."""
+    if value is None:
+        return None
+    return value.strip().lower() or None
+
+# values that aren't free text, where case is significant: base64 keyset cursors, and
+# facets/count, which are validated case-sensitively after the cache lookup
+OPAQUE_PARAMS = frozenset({"cursor", "facets", "count"})
+
+def normalize_params(params: dict, opaque=OPAQUE_PARAMS):
+    """Hashable, order-independent form of query filters for use in cache keys; empty values are dropped.
+
+    Text filters are case folded; ``opaque`` params are only trimmed.
+    """
+    normalized = []
+    for k, v in sorted(params.items()):
+        if v is None or v == [] or v == "":
+            continue
+        if isinstance(v, str):
+            v = v.strip() if k in opaque else v.strip().lower()
+        elif isinstance(v, (list, tuple, set)):
+            v = tuple(sorted(str(x) for x in v))
+        else:
+            v = str(v)
+        normalized.append((k, v))
+    return tuple(normalized)
+
+# opaque keyset cursors: base64 of the (sort timestamp, id) of the last row served
+def encode_cursor(sort_value: datetime, row_id) -> str:
+    raw = json.dumps({"t": sort_value.isoformat(), "id": str(row_id)})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    """Return (datetime, UUID) from a cursor; raises ValueError if it is malformed."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(data["t"]), UUID(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("invalid cursor")
+
+def keyset_filter(query, sort_col, id_col, cursor: str, descending: bool = True):
+    # row-value comparison so postgres can seek on a (sort_col, id) index
+    sort_value, row_id = decode_cursor(cursor)
+    if descending:
+        return query.filter(tuple_(sort_col, id_col) < (sort_value, row_id))
+    return query.filter(tuple_(sort_col, id_col) > (sort_value, row_id))
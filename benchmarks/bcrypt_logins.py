@@ -0,0 +1,43 @@
+"""Logins/sec per core at a given bcrypt cost.
+
+Usage: python -m benchmarks.bcrypt_logins --rounds 12 --workers 4 --seconds 10
+
+Runs password verification the same way the login route does (through
+app.hashing.PasswordHasher) with enough concurrent callers to keep the
+process pool saturated, and reports throughput overall and per worker process.
+"""
+import argparse
+import asyncio
+import time
+from app.hashing import PasswordHasher, default_workers
+
+PASSWORD = "Benchmark#Passw0rd"
+
+async def run(rounds: int, workers: int, seconds: float):
+    hasher = PasswordHasher(rounds=rounds, workers=workers, max_pending=workers * 2)
+    hashed = await hasher.hash(PASSWORD)
+    await hasher.verify_and_update(PASSWORD, hashed)  # warm the pool
+    deadline = time.perf_counter() + seconds
+
+    async def caller():
+        n = 0
+        while time.perf_counter() < deadline:
+            await hasher.verify_and_update(PASSWORD, hashed)
+            n += 1
+        return n
+
+    start = time.perf_counter()
+    done = sum(await asyncio.gather(*(caller() for _ in range(max(workers, 1) * 2))))
+    elapsed = time.perf_counter() - start
+    hasher.shutdown()
+    per_sec = done / elapsed
+    print(f"rounds={rounds} workers={workers} logins={done} elapsed={elapsed:.2f}s")
+    print(f"logins/sec={per_sec:.1f} logins/sec/core={per_sec / max(workers, 1):.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.rounds, args.workers, args.seconds))
@@ -0,0 +1,119 @@
+"""Server memory while streaming a large application export.
+
+Usage:
+    python -m benchmarks.export_rss --rows 1000000 --create-schema
+    python -m benchmarks.export_rss --rows 1000000 --format ndjson --gzip
+
+Seeds one company with one job and ``rows`` applications (bulk inserts, see
+benchmarks.seed). It then starts a uvicorn server against the same
+DATABASE_URL, downloads /api/applications/jobs/{id}/export, and samples the
+server's resident memory (from /proc, so Linux only) as the bytes arrive. With
+a streamed export the RSS column stays flat from the first 10% of rows to the
+last.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+import httpx
+from app import models
+from app.db import SessionLocal, dispose_engines
+from benchmarks import seed as seeding
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+async def seed_applications(job_id, rows: int, run_id: str):
+    now = datetime.utcnow()
+    async with SessionLocal() as db:
+        for start in range(0, rows, seeding.CHUNK):
+            users, applications = [], []
+            for i in range(start, min(start + seeding.CHUNK, rows)):
+                user_id = uuid.uuid4()
+                users.append({"id": user_id, "full_name": f"Export Applicant {i}", "email": f"bench-{run_id}-export-{i}@example.com",
+                              "password_hash": "!", "role": models.RoleEnum.applicant, "is_verified": 1, "created_at": now})
+                applications.append({"id": uuid.uuid4(), "applicant_id": user_id, "job_id": job_id,
+                                     "resume_link": f"https://example.com/resumes/{user_id}.pdf", "resume_status": models.ResumeStatus.ready,
+                                     "cover_letter": "Seeded for the export benchmark", "status": models.ApplicationStatus.Applied,
+                                     "applied_at": now - timedelta(seconds=i)})
+            await seeding._bulk(db, models.User, users)
+            await seeding._bulk(db, models.Application, applications)
+            await db.commit()
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def wait_ready(client, timeout=30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await client.get("/")
+            return
+        except httpx.TransportError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+async def _login(client, email):
+    r = await client.post("/api/auth/login", json={"email": email, "password": seeding.PASSWORD})
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['object']['access_token']}"}
+
+async def main(args):
+    dataset = await seeding.seed(1, 1, 0, 0, args.seed, args.create_schema)
+    job_id = dataset.jobs[0][0]
+    start = time.perf_counter()
+    await seed_applications(job_id, args.rows, dataset.run_id)
+    await dispose_engines()
+    print(f"seeded {args.rows} applications in {time.perf_counter() - start:.1f}s")
+
+    port = _free_port()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"], env=os.environ.copy())
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+            await wait_ready(client)
+            headers = await _login(client, dataset.companies[0][1])
+            headers["Accept-Encoding"] = "gzip" if args.gzip else "identity"
+            baseline = rss_mb(server.pid)
+            print(f"server RSS before export: {baseline:.1f} MB")
+            print(f"{'rows':>10} {'MB sent':>9} {'RSS MB':>8}")
+            marks = [args.rows * pct // 10 for pct in range(1, 11)]
+            received = lines = rows = peak = 0
+            start = time.perf_counter()
+            url = f"/api/applications/jobs/{job_id}/export?format={args.format}"
+            async with client.stream("GET", url, headers=headers) as resp:
+                resp.raise_for_status()
+                # count rows on the decoded stream; bytes on the wire
+                async for chunk in resp.aiter_bytes():
+                    lines += chunk.count(b"\n")
+                    received = resp.num_bytes_downloaded
+                    rows = lines - (1 if args.format == "csv" else 0)
+                    peak = max(peak, rss_mb(server.pid))
+                    while marks and rows >= marks[0]:
+                        print(f"{marks.pop(0):>10} {received / 1e6:>9.1f} {rss_mb(server.pid):>8.1f}")
+            elapsed = time.perf_counter() - start
+            print(f"exported {rows} rows ({received / 1e6:.1f} MB) in {elapsed:.1f}s, {rows / elapsed:,.0f} rows/s; "
+                  f"peak server RSS {peak:.1f} MB ({peak - baseline:+.1f} MB over baseline)")
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    parser.add_argument("--gzip", action="store_true", help="request Content-Encoding: gzip")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--create-schema", action="store_true", help="create tables first (throwaway databases only)")
+    asyncio.run(main(parser.parse_args()))
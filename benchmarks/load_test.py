@@ -0,0 +1,65 @@
+"""Requests/sec against a running API server.
+
+Usage:
+    uvicorn app.main:app --workers 1 &
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000 \
+        --email applicant@example.com --password 'Passw0rd!' --concurrency 64 --seconds 20
+
+Logs in once, then keeps ``concurrency`` clients hitting the browse and job
+detail endpoints for ``seconds`` and prints throughput and latency percentiles.
+To compare with the old threadpool-bound sync routes, run the same command
+against a server started from a checkout before the async port.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+async def run(base_url, email, password, concurrency, seconds):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        r = await client.post("/api/auth/login", json={"email": email, "password": password})
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['object']['access_token']}"}
+        jobs = (await client.get("/api/jobs/", headers=headers)).json()["object"]
+        paths = ["/api/jobs/"] + [f"/api/jobs/{j['id']}" for j in jobs[:5]]
+
+        latencies, errors = [], 0
+        deadline = time.perf_counter() + seconds
+
+        async def worker(n):
+            nonlocal errors
+            i = n
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                resp = await client.get(paths[i % len(paths)], headers=headers)
+                latencies.append(time.perf_counter() - start)
+                if resp.status_code >= 400:
+                    errors += 1
+                i += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    print(f"requests={len(latencies)} errors={errors} elapsed={elapsed:.2f}s concurrency={concurrency}")
+    print(f"requests/sec={len(latencies) / elapsed:.1f}")
+    if latencies:
+        print("latency ms: p50={:.1f} p95={:.1f} p99={:.1f} mean={:.1f}".format(
+            percentile(latencies, 50) * 1000, percentile(latencies, 95) * 1000,
+            percentile(latencies, 99) * 1000, statistics.mean(latencies) * 1000))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.email, args.password, args.concurrency, args.seconds))
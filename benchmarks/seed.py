@@ -0,0 +1,112 @@
+"""Bulk-seed a benchmark dataset through the app's own engine (DATABASE_URL).
+
+Usage: python -m benchmarks.seed --companies 10 --jobs 200 --applicants 200 --applications 2000
+
+Rows go in with multi-row INSERTs rather than through the API, so seeding a
+large dataset takes seconds. Every seeded user shares PASSWORD and is already
+verified. The schema must exist (``alembic upgrade head``, or --create-schema
+for a throwaway database).
+"""
+import argparse
+import asyncio
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from app import models
+from app.config import settings
+from app.db import Base, SessionLocal, engine
+from app.hashing import PasswordHasher
+from app.utils import normalize_location
+
+PASSWORD = "Benchmark#Passw0rd"
+CHUNK = 1000
+LOCATIONS = ["Lagos", "Abuja", "Nairobi", "Accra", "Remote", "Cape Town", "Kigali", "London"]
+TITLES = ["Backend engineer", "Frontend developer", "Data analyst", "DevOps engineer", "Product designer", "QA engineer"]
+
+@dataclass
+class Dataset:
+    run_id: str
+    companies: list = field(default_factory=list)   # (id, email)
+    applicants: list = field(default_factory=list)  # (id, email)
+    jobs: list = field(default_factory=list)        # (id, company_id)
+    applications: list = field(default_factory=list)  # (id, applicant_id, job_id, company_id)
+    applied: set = field(default_factory=set)       # {(applicant_id, job_id)}
+
+    def summary(self) -> dict:
+        return {"companies": len(self.companies), "applicants": len(self.applicants), "jobs": len(self.jobs), "applications": len(self.applications)}
+
+async def _bulk(db, model, rows):
+    for i in range(0, len(rows), CHUNK):
+        await db.execute(insert(model), rows[i:i + CHUNK])
+
+async def seed(companies: int, jobs: int, applicants: int, applications: int, seed_value: int = 0, create_schema: bool = False) -> Dataset:
+    rng = random.Random(seed_value)
+    if create_schema:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    # real cost, so the login scenario verifies without triggering a rehash
+    hasher = PasswordHasher(rounds=settings.BCRYPT_ROUNDS, workers=1, max_pending=1)
+    password_hash = await hasher.hash(PASSWORD)
+    hasher.shutdown()
+    data = Dataset(run_id=uuid.uuid4().hex[:8])
+    now = datetime.utcnow()
+
+    users = []
+    for role, count, bucket in (("company", companies, data.companies), ("applicant", applicants, data.applicants)):
+        for i in range(count):
+            user_id, email = uuid.uuid4(), f"bench-{data.run_id}-{role}-{i}@example.com"
+            bucket.append((user_id, email))
+            users.append({"id": user_id, "full_name": f"Bench {role.title()} {i}", "email": email, "password_hash": password_hash,
+                          "role": models.RoleEnum(role), "is_verified": 1, "created_at": now})
+    job_rows = []
+    for i in range(jobs):
+        company_id = data.companies[i % companies][0]
+        job_id = uuid.uuid4()
+        data.jobs.append((job_id, company_id))
+        created = now - timedelta(minutes=jobs - i)
+        location = rng.choice(LOCATIONS)
+        job_rows.append({"id": job_id, "title": f"{rng.choice(TITLES)} {i}", "description": f"Seeded benchmark job number {i}. " * 4,
+                         "location": location, "location_normalized": normalize_location(location), "status": models.JobStatus.Open, "created_by": company_id,
+                         "created_at": created, "updated_at": created, "version": 1})
+    application_rows = []
+    capacity = applicants * jobs
+    while len(application_rows) < min(applications, capacity):
+        applicant_id = rng.choice(data.applicants)[0]
+        job_id, company_id = rng.choice(data.jobs)
+        if (applicant_id, job_id) in data.applied:
+            continue
+        data.applied.add((applicant_id, job_id))
+        application_id = uuid.uuid4()
+        data.applications.append((application_id, applicant_id, job_id, company_id))
+        application_rows.append({"id": application_id, "applicant_id": applicant_id, "job_id": job_id,
+                                 "resume_link": f"https://example.com/resumes/{application_id}.pdf",
+                                 "resume_status": models.ResumeStatus.ready, "cover_letter": "Seeded",
+                                 "status": models.ApplicationStatus.Applied, "applied_at": now - timedelta(seconds=len(application_rows))})
+
+    async with SessionLocal() as db:
+        await _bulk(db, models.User, users)
+        await _bulk(db, models.Job, job_rows)
+        await _bulk(db, models.Application, application_rows)
+        per_job = {}
+        for row in application_rows:
+            per_job[row["job_id"]] = per_job.get(row["job_id"], 0) + 1
+        await _bulk(db, models.JobStatusCount, [{"job_id": j, "status": models.ApplicationStatus.Applied, "count": n} for j, n in per_job.items()])
+        await db.commit()
+    return data
+
+def add_arguments(parser):
+    parser.add_argument("--companies", type=int, default=10)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--applicants", type=int, default=200)
+    parser.add_argument("--applications", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the generated data")
+    parser.add_argument("--create-schema", action="store_true", help="create tables first (throwaway databases only)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    args = parser.parse_args()
+    dataset = asyncio.run(seed(args.companies, args.jobs, args.applicants, args.applications, args.seed, args.create_schema))
+    print(f"seeded run {dataset.run_id}: {dataset.summary()} (password {PASSWORD!r})")
@@ -0,0 +1,84 @@
+"""Cold start: time from a fresh interpreter importing the app to its first response.
+
+Usage:
+    python -m benchmarks.startup --runs 10
+    python -m benchmarks.startup --runs 5 --target server
+
+--target asgi (the default) runs each sample in a new interpreter. It times
+``import app.main``, ``create_app()``, the lifespan startup, and a first ``GET /``
+served in-process, so the import cost is measured without any server overhead.
+--target server starts ``uvicorn app.main:app`` and times spawn-to-first-200,
+which is what a restarted or forked worker pays. Both read settings from the
+environment (or .env) like the app does; no database connection is needed.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+
+PROBE = r"""
+import asyncio, json, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+application = app.main.create_app()
+created = time.perf_counter()
+
+async def first_response():
+    import httpx
+    async with application.router.lifespan_context(application):
+        started = time.perf_counter()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=application), base_url="http://startup") as client:
+            (await client.get("/")).raise_for_status()
+        return started, time.perf_counter()
+
+started, responded = asyncio.run(first_response())
+print(json.dumps({"import_ms": (imported - start) * 1000, "create_app_ms": (created - imported) * 1000,
+                  "lifespan_ms": (started - created) * 1000, "first_response_ms": (responded - started) * 1000,
+                  "total_ms": (responded - start) * 1000}))
+"""
+
+def asgi_sample():
+    out = subprocess.check_output([sys.executable, "-c", PROBE], text=True, env=os.environ.copy())
+    return json.loads(out.strip().splitlines()[-1])
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def server_sample(timeout=60):
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"], env=os.environ.copy())
+    try:
+        while True:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                    return {"total_ms": (time.perf_counter() - start) * 1000}
+            except httpx.TransportError:
+                pass
+            if server.poll() is not None or time.perf_counter() - start > timeout:
+                raise RuntimeError("server did not come up")
+            time.sleep(0.005)
+    finally:
+        server.terminate()
+        server.wait()
+
+def main(args):
+    sample = asgi_sample if args.target == "asgi" else server_sample
+    runs = [sample() for _ in range(args.runs)]
+    for phase in runs[0]:
+        values = [r[phase] for r in runs]
+        print(f"{phase:>18}: median {statistics.median(values):8.1f} ms   min {min(values):8.1f} ms   max {max(values):8.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=("asgi", "server"), default="asgi")
+    parser.add_argument("--runs", type=int, default=10)
+    main(parser.parse_args())
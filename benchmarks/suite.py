@@ -0,0 +1,194 @@
+"""Scenario benchmarks over the real API flows, with JSON results for comparing commits.
+
+Usage:
+    # in-process, against the ASGI app (no server needed)
+    STORAGE_BACKEND=local python -m benchmarks.suite --target asgi --requests 300 --concurrency 16
+
+    # against a local server sharing the same DATABASE_URL
+    uvicorn app.main:app --workers 1 &
+    python -m benchmarks.suite --target http --base-url http://127.0.0.1:8000
+
+    # compare with an earlier run
+    python -m benchmarks.suite --target asgi --compare benchmarks/results/<commit>-asgi.json
+
+Seeds a fresh dataset (see benchmarks.seed), then runs the signup, login,
+browse, browse_facets, job_detail, apply and status_update scenarios one after another. For
+each one it reports throughput, p50/p95/p99 latency, and SQL statements per
+request, which come from the /metrics endpoint when METRICS_ENABLED and METRICS_TOKEN are set.
+Results are written to benchmarks/results/<commit>-<target>.json.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import time
+from datetime import datetime, timezone
+import httpx
+from app.config import settings
+from benchmarks import seed as seeding
+from benchmarks.load_test import percentile
+
+SCENARIOS = ("signup", "login", "browse", "browse_facets", "job_detail", "apply", "status_update")
+STATUS_CYCLE = ("Reviewed", "Interview", "Rejected", "Hired")
+
+class Exhausted(Exception):
+    """The scenario ran out of seeded data (e.g. no unapplied jobs left)."""
+
+class Context:
+    def __init__(self, dataset, users):
+        self.dataset = dataset
+        self.applicant_headers = {}
+        self.company_headers = {}
+        logged_in = {a[0] for a in dataset.applicants[:users]}
+        # (applicant, job) pairs the seeded data left open, so every apply is a first apply
+        self.free_pairs = iter([(a, j[0]) for a, j in itertools.product(sorted(logged_in), dataset.jobs) if (a, j[0]) not in dataset.applied])
+        self.company_applications = [a for a in dataset.applications if a[3] in {c[0] for c in dataset.companies[:users]}]
+
+    def any_applicant(self, i):
+        headers = list(self.applicant_headers.values())
+        return headers[i % len(headers)]
+
+async def _login(client, email):
+    r = await client.post("/api/auth/login", json={"email": email, "password": seeding.PASSWORD})
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['object']['access_token']}"}
+
+async def prepare(client, ctx, users):
+    for user_id, email in ctx.dataset.applicants[:users]:
+        ctx.applicant_headers[user_id] = await _login(client, email)
+    for user_id, email in ctx.dataset.companies[:users]:
+        ctx.company_headers[user_id] = await _login(client, email)
+
+async def signup(client, ctx, i):
+    email = f"bench-{ctx.dataset.run_id}-signup-{i}@example.com"
+    return await client.post("/api/auth/signup", json={"full_name": "Bench Signup", "email": email, "password": seeding.PASSWORD, "role": "applicant"})
+
+async def login(client, ctx, i):
+    return await client.post("/api/auth/login", json={"email": ctx.dataset.applicants[i % len(ctx.dataset.applicants)][1], "password": seeding.PASSWORD})
+
+async def browse(client, ctx, i):
+    return await client.get(f"/api/jobs/?page={i % 10 + 1}&size=20", headers=ctx.any_applicant(i))
+
+async def browse_facets(client, ctx, i):
+    location = seeding.LOCATIONS[i % len(seeding.LOCATIONS)]
+    return await client.get(f"/api/jobs/?facets=all&location={location}&page={i % 3 + 1}&size=20", headers=ctx.any_applicant(i))
+
+async def job_detail(client, ctx, i):
+    job_id = ctx.dataset.jobs[i % len(ctx.dataset.jobs)][0]
+    return await client.get(f"/api/jobs/{job_id}", headers=ctx.any_applicant(i))
+
+async def apply(client, ctx, i):
+    pair = next(ctx.free_pairs, None)
+    if pair is None:
+        raise Exhausted("no unapplied (applicant, job) pairs left; seed more jobs or lower --requests")
+    applicant_id, job_id = pair
+    files = {"resume": (f"cv-{i}.pdf", f"%PDF-1.4 benchmark resume {ctx.dataset.run_id} {i}".encode(), "application/pdf")}
+    return await client.post(f"/api/applications/jobs/{job_id}/apply", files=files, headers=ctx.applicant_headers[applicant_id])
+
+async def status_update(client, ctx, i):
+    application_id, _, _, company_id = ctx.company_applications[i % len(ctx.company_applications)]
+    return await client.patch(f"/api/applications/{application_id}/status", json={"new_status": STATUS_CYCLE[i % len(STATUS_CYCLE)]},
+                              headers=ctx.company_headers[company_id])
+
+async def sql_statements(client):
+    """Total statements executed so far according to /metrics, or None when metrics are off."""
+    r = await client.get("/metrics", headers={"Authorization": f"Bearer {settings.METRICS_TOKEN}"})
+    if r.status_code != 200:
+        return None
+    return sum(float(line.rsplit(" ", 1)[1]) for line in r.text.splitlines() if line.startswith("db_statements_total{"))
+
+async def run_scenario(client, ctx, fn, requests, concurrency):
+    counter = itertools.count()
+    latencies, errors = [], 0
+    sql_before = await sql_statements(client)
+
+    async def worker():
+        nonlocal errors
+        while (i := next(counter)) < requests:
+            start = time.perf_counter()
+            try:
+                resp = await fn(client, ctx, i)
+                failed = resp.status_code >= 400 or resp.json().get("success") is False
+            except Exhausted:
+                return
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    sql_after = await sql_statements(client)
+    result = {"requests": len(latencies), "errors": errors, "seconds": round(elapsed, 3),
+              "throughput": round(len(latencies) / elapsed, 1) if elapsed else None,
+              "sql_per_request": round((sql_after - sql_before) / len(latencies), 2) if latencies and sql_before is not None else None}
+    for pct in (50, 95, 99):
+        result[f"p{pct}_ms"] = round(percentile(latencies, pct) * 1000, 2) if latencies else None
+    return result
+
+def _commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def compare(current, previous):
+    print(f"\nvs {previous['commit']} ({previous['timestamp']}):")
+    for name, now in current["scenarios"].items():
+        before = previous["scenarios"].get(name)
+        if not before:
+            continue
+        deltas = []
+        for key in ("throughput", "p95_ms", "sql_per_request"):
+            if now.get(key) is not None and before.get(key):
+                deltas.append(f"{key} {before[key]} -> {now[key]} ({(now[key] - before[key]) / before[key] * 100:+.1f}%)")
+        print(f"  {name:>13}: " + ", ".join(deltas))
+
+async def main(args):
+    dataset = await seeding.seed(args.companies, args.jobs, args.applicants, args.applications, args.seed, args.create_schema)
+    if args.target == "asgi":
+        from app.main import app
+        transport, base_url = httpx.ASGITransport(app=app), "http://bench"
+    else:
+        transport, base_url = None, args.base_url
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {"commit": _commit(), "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"), "target": args.target,
+               "dataset": dataset.summary(), "requests": args.requests, "concurrency": args.concurrency, "scenarios": {}}
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as client:
+        ctx = Context(dataset, args.users)
+        await prepare(client, ctx, args.users)
+        for name in args.scenarios:
+            # login and signup are bcrypt-bound; cap them so a run stays short
+            requests = min(args.requests, args.auth_requests) if name in ("signup", "login") else args.requests
+            result = await run_scenario(client, ctx, globals()[name], requests, args.concurrency)
+            results["scenarios"][name] = result
+            print(f"{name:>13}: {result['requests']:5d} req  {result['errors']:3d} err  {result['throughput']} req/s  "
+                  f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms  sql/req={result['sql_per_request']}")
+    if args.target == "asgi":
+        from app.db import dispose_engines
+        await dispose_engines()
+    out = args.out or os.path.join("benchmarks", "results", f"{results['commit']}-{args.target}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {out}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    seeding.add_arguments(parser)
+    parser.add_argument("--target", choices=("asgi", "http"), default="asgi")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=300, help="requests per scenario")
+    parser.add_argument("--auth-requests", type=int, default=50, help="cap for the signup/login scenarios")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=8, help="applicants and companies logged in up front")
+    parser.add_argument("--out", help="results file (default benchmarks/results/<commit>-<target>.json)")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,161 @@
+import email
+import socketserver
+import threading
+import uuid
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from sqlalchemy import event
+from app import db as app_db, models
+from app.config import Settings
+from app.main import create_app
+from app.tokens import create_access_token
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+def settings(tmp_path):
+    # a throwaway SQLite database per test; nothing is read from the environment or .env
+    return Settings(
+        _env_file=None,
+        SECRET_KEY="test-secret",
+        DATABASE_URL=f"sqlite:///{tmp_path / 'test.db'}",
+        EMAIL_FROM="jobs@example.com",
+        SMTP_HOST="localhost",
+        SMTP_USER="",
+        SMTP_PASSWORD="",
+        CLOUDINARY_CLOUD_NAME="test",
+        CLOUDINARY_API_KEY="test",
+        CLOUDINARY_API_SECRET="test",
+        STORAGE_BACKEND="local",
+        LOCAL_STORAGE_DIR=str(tmp_path / "uploads"),
+        BCRYPT_ROUNDS=4,
+        METRICS_ENABLED=False,
+    )
+
+@pytest.fixture
+async def app(settings):
+    application = create_app(settings)
+    async with app_db.engine.begin() as conn:
+        await conn.run_sync(app_db.Base.metadata.create_all)
+    yield application
+    await app_db.dispose_engines()
+
+@pytest.fixture
+async def client(app):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+@pytest.fixture
+async def db(app):
+    async with app_db.SessionLocal() as session:
+        yield session
+
+class StatementCounter:
+    """SQL statements sent to the database while active (every before_cursor_execute)."""
+
+    def __init__(self):
+        self.statements = []
+        self.active = False
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active:
+            self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements.clear()
+        self.active = True
+        return self
+
+    def __exit__(self, *exc):
+        self.active = False
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+@pytest.fixture
+def statements(app):
+    counter = StatementCounter()
+    event.listen(app_db.engine.sync_engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(app_db.engine.sync_engine, "before_cursor_execute", counter)
+
+def auth_headers(user: models.User):
+    token = create_access_token({"user_id": str(user.id), "role": user.role.value})
+    return {"Authorization": f"Bearer {token}"}
+
+async def make_user(db, role: str, name: str = None):
+    user = models.User(full_name=name or f"{role} {uuid.uuid4().hex[:6]}", email=f"{uuid.uuid4().hex}@example.com",
+                       password_hash="!", role=models.RoleEnum(role), is_verified=1)
+    db.add(user)
+    await db.commit()
+    return user
+
+async def make_jobs(db, company, count: int, location: str = "Lagos"):
+    now = datetime.utcnow()
+    jobs = [models.Job(title=f"Job {i}", description="Testing", location=location, location_normalized=location.lower(),
+                       status=models.JobStatus.Open, created_by=company.id, created_at=now - timedelta(minutes=i)) for i in range(count)]
+    db.add_all(jobs)
+    await db.commit()
+    return jobs
+
+async def make_applications(db, job, applicants):
+    now = datetime.utcnow()
+    applications = [models.Application(applicant_id=a.id, job_id=job.id, resume_link="https://example.com/resume.pdf", cover_letter="Hello",
+                                       applied_at=now - timedelta(minutes=i)) for i, a in enumerate(applicants)]
+    db.add_all(applications)
+    await db.commit()
+    return applications
+
+class SMTPStub:
+    """Plain SMTP server on a background thread. Records connections and messages; recipients in ``reject`` get a 550."""
+
+    def __init__(self):
+        stub = self
+        self.connections = 0
+        self.messages = []
+        self.reject = set()
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                stub.connections += 1
+                self.reply("220 stub ready")
+                for raw in self.rfile:
+                    command = raw.decode().strip()
+                    verb = command[:4].upper()
+                    if verb in ("EHLO", "HELO", "MAIL", "RSET", "NOOP"):
+                        self.reply("250 ok")
+                    elif verb == "RCPT":
+                        address = command.split(":", 1)[1].strip().strip("<>")
+                        self.reply("550 no such user" if address in stub.reject else "250 ok")
+                    elif verb == "DATA":
+                        self.reply("354 go ahead")
+                        data = b"".join(iter(self.rfile.readline, b".\r\n"))
+                        stub.messages.append(email.message_from_bytes(data))
+                        self.reply("250 queued")
+                    elif verb == "QUIT":
+                        self.reply("221 bye")
+                        return
+                    else:
+                        self.reply("502 not implemented")
+
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+@pytest.fixture
+def smtp_stub():
+    stub = SMTPStub()
+    yield stub
+    stub.close()
@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import func, select, update
+from app import crud, models
+from app.db import SessionLocal
+from .conftest import auth_headers, make_applications, make_jobs, make_user
+
+pytestmark = pytest.mark.anyio
+
+async def queued_emails(db):
+    return await db.scalar(select(func.count()).select_from(models.EmailOutbox))
+
+async def test_status_change_queues_one_email(client, db):
+    company = await make_user(db, "company")
+    applicant = await make_user(db, "applicant")
+    [job] = await make_jobs(db, company, 1)
+    [application] = await make_applications(db, job, [applicant])
+    url = f"/api/applications/{application.id}/status"
+    r = await client.patch(url, json={"new_status": "Interview"}, headers=auth_headers(company))
+    assert r.status_code == 200
+    assert r.json()["object"]["status"] == "Interview"
+    assert await queued_emails(db) == 1
+    # already there: nothing changes, nothing more is sent
+    r = await client.patch(url, json={"new_status": "Interview"}, headers=auth_headers(company))
+    assert r.status_code == 200
+    assert await queued_emails(db) == 1
+
+async def test_concurrent_change_writes_nothing(app, db):
+    company = await make_user(db, "company")
+    [job] = await make_jobs(db, company, 1)
+    [application] = await make_applications(db, job, [await make_user(db, "applicant")])
+    # another request moves it after we read it
+    async with SessionLocal() as other:
+        await other.execute(update(models.Application).where(models.Application.id == application.id).values(status=models.ApplicationStatus.Rejected))
+        await other.commit()
+    assert application.status == models.ApplicationStatus.Applied
+    assert await crud.update_application_status(db, application, "Interview") is False
+    await db.refresh(application)
+    assert application.status == models.ApplicationStatus.Rejected
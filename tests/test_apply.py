@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import select, update
+from app import crud, models
+from app.db import SessionLocal
+from app.storage import get_storage
+from .conftest import auth_headers, make_jobs, make_user
+
+pytestmark = pytest.mark.anyio
+
+async def test_claim_is_one_statement_and_detects_duplicates(app, db, statements):
+    company = await make_user(db, "company")
+    applicant = await make_user(db, "applicant")
+    [job] = await make_jobs(db, company, 1)
+    # a duplicate claim rolls back, which expires these
+    applicant_id, job_id = applicant.id, job.id
+    with statements:
+        first, created = await crud.claim_application(db, applicant_id, job_id, "Hello")
+    assert created
+    assert statements.count == 1, statements.statements
+    with statements:
+        again, created = await crud.claim_application(db, applicant_id, job_id, "Hello again")
+    assert not created
+    assert again == first
+    assert statements.count == 1, statements.statements
+    ids = (await db.scalars(select(models.Application.id).where(models.Application.job_id == job_id))).all()
+    assert ids == [first]
+
+async def test_pending_claim_is_hidden_from_the_company(client, db):
+    company = await make_user(db, "company")
+    applicant = await make_user(db, "applicant")
+    [job] = await make_jobs(db, company, 1)
+    application_id, _ = await crud.claim_application(db, applicant.id, job.id, "Hello")
+    headers = auth_headers(company)
+
+    async def company_view():
+        listing = (await client.get(f"/api/applications/jobs/{job.id}", headers=headers)).json()
+        export = (await client.get(f"/api/applications/jobs/{job.id}/export", params={"format": "ndjson"}, headers=headers)).text
+        dashboard = (await client.get("/api/jobs/dashboard", headers=headers)).json()
+        return listing["totalSize"], export.count("\n"), dashboard
+
+    total, exported, dashboard = await company_view()
+    assert (total, exported) == (0, 0)
+    assert dashboard["object"]["total"] == 0
+    # the applicant sees their own pending application
+    mine = (await client.get("/api/applications/me", headers=auth_headers(applicant))).json()
+    assert mine["totalSize"] == 1
+
+    resume = await crud.save_resume(db, applicant.id, "0" * 64, "https://example.com/resume.pdf", 10, "application/pdf")
+    await crud.set_resume_result(db, application_id, resume)
+    total, exported, dashboard = await company_view()
+    assert (total, exported) == (1, 1)
+    assert dashboard["object"]["totals"]["Applied"] == 1
+
+async def test_apply_then_duplicate(client, db):
+    company = await make_user(db, "company")
+    applicant = await make_user(db, "applicant")
+    [job] = await make_jobs(db, company, 1)
+    resume = {"resume": ("cv.pdf", b"%PDF-1.4 resume", "application/pdf")}
+    r = await client.post(f"/api/applications/jobs/{job.id}/apply", files=resume, headers=auth_headers(applicant))
+    assert r.json()["success"], r.json()
+    application_id = r.json()["object"]["application_id"]
+    r = await client.post(f"/api/applications/jobs/{job.id}/apply", files=resume, headers=auth_headers(applicant))
+    assert r.json()["errors"] == ["duplicate application"]
+    assert r.json()["object"]["application_id"] == application_id
+    listing = (await client.get(f"/api/applications/jobs/{job.id}", headers=auth_headers(company))).json()
+    assert [a["application_id"] for a in listing["object"]] == [application_id]
+    assert listing["object"][0]["resume_status"] == "ready"
+
+async def age_claim(application_id, seconds):
+    async with SessionLocal() as other:
+        await other.execute(update(models.Application).where(models.Application.id == application_id)
+                            .values(applied_at=datetime.utcnow() - timedelta(seconds=seconds)))
+        await other.commit()
+
+async def test_reapply_after_interrupted_claim(client, db, settings):
+    company = await make_user(db, "company")
+    applicant = await make_user(db, "applicant")
+    [job] = await make_jobs(db, company, 1)
+    # a request that claimed and then died mid-upload: nothing released the row
+    claimed, _ = await crud.claim_application(db, applicant.id, job.id, "Hello")
+    resume = {"resume": ("cv.pdf", b"%PDF-1.4 resume", "application/pdf")}
+    url = f"/api/applications/jobs/{job.id}/apply"
+    # still within the timeout, it may be in flight
+    r = await client.post(url, files=resume, headers=auth_headers(applicant))
+    assert r.json()["errors"] == ["duplicate application"]
+
+    await age_claim(claimed, settings.APPLICATION_CLAIM_TIMEOUT_SECONDS + 1)
+    r = await client.post(url, files=resume, headers=auth_headers(applicant))
+    assert r.json()["success"], r.json()
+    assert r.json()["object"]["application_id"] == str(claimed)
+    listing = (await client.get(f"/api/applications/jobs/{job.id}", headers=auth_headers(company))).json()
+    assert [a["resume_status"] for a in listing["object"]] == ["ready"]
+    dashboard = (await client.get("/api/jobs/dashboard", headers=auth_headers(company))).json()
+    assert dashboard["object"]["totals"]["Applied"] == 1
+
+async def test_failed_upload_can_be_redone(app, db):
+    company = await make_user(db, "company")
+    applicant = await make_user(db, "applicant")
+    [job] = await make_jobs(db, company, 1)
+    applicant_id, job_id = applicant.id, job.id
+    claimed, _ = await crud.claim_application(db, applicant_id, job_id, "Hello")
+    await crud.set_resume_result(db, claimed, None)
+    again, created = await crud.claim_application(db, applicant_id, job_id, "Hello again")
+    assert (again, created) == (claimed, True)
+    # a ready application is never taken over
+    resume = await crud.save_resume(db, applicant_id, "1" * 64, "https://example.com/resume.pdf", 10, "application/pdf")
+    await crud.set_resume_result(db, claimed, resume)
+    await age_claim(claimed, 10 ** 6)
+    assert await crud.claim_application(db, applicant_id, job_id, "Once more") == (claimed, False)
+
+async def test_cancelled_upload_releases_the_claim(client, db, monkeypatch):
+    company = await make_user(db, "company")
+    applicant = await make_user(db, "applicant")
+    [job] = await make_jobs(db, company, 1)
+    job_id = job.id
+
+    class Interrupted(BaseException):
+        pass
+
+    async def interrupted_save(*args):
+        raise Interrupted()
+    monkeypatch.setattr(get_storage(), "save", interrupted_save)
+    resume = {"resume": ("cv.pdf", b"%PDF-1.4 resume", "application/pdf")}
+    with pytest.raises(Interrupted):
+        await client.post(f"/api/applications/jobs/{job_id}/apply", files=resume, headers=auth_headers(applicant))
+    assert (await db.scalars(select(models.Application.id).where(models.Application.job_id == job_id))).all() == []
+
+async def test_reuse_picks_the_last_resume_used(client, db):
+    company = await make_user(db, "company")
+    applicant = await make_user(db, "applicant")
+    jobs = await make_jobs(db, company, 4)
+    headers = auth_headers(applicant)
+    links = []
+    for job, content in zip(jobs, (b"%PDF-1.4 A", b"%PDF-1.4 B", b"%PDF-1.4 A")):
+        r = await client.post(f"/api/applications/jobs/{job.id}/apply", files={"resume": ("cv.pdf", content, "application/pdf")}, headers=headers)
+        assert r.json()["success"], r.json()
+        listing = (await client.get(f"/api/applications/jobs/{job.id}", headers=auth_headers(company))).json()
+        links.append(listing["object"][0]["resume_link"])
+    assert links[0] == links[2] != links[1]
+    # A was first stored before B (created_at has one-second resolution on sqlite, so make it explicit)
+    async with SessionLocal() as other:
+        for link, age in ((links[0], 2), (links[1], 1)):
+            await other.execute(update(models.Resume).where(models.Resume.url == link).values(created_at=datetime.utcnow() - timedelta(hours=age)))
+        await other.commit()
+    r = await client.post(f"/api/applications/jobs/{jobs[3].id}/apply", params={"reuse_last_resume": True}, headers=headers)
+    assert r.json()["success"], r.json()
+    listing = (await client.get(f"/api/applications/jobs/{jobs[3].id}", headers=auth_headers(company))).json()
+    assert listing["object"][0]["resume_link"] == links[0]
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import select
+from app import models
+from app.email_utils import SMTPMailer, enqueue_email
+from app.email_worker import RateLimiter, drain_once
+
+pytestmark = pytest.mark.anyio
+
+def mailer_for(stub):
+    return SMTPMailer("127.0.0.1", stub.port, "", "", idle_timeout=60, starttls=False)
+
+async def queue(db, *recipients):
+    for to_email in recipients:
+        enqueue_email(db, to_email, f"Hello {to_email}", "<p>hi</p>")
+    await db.commit()
+
+async def outbox(db):
+    db.expire_all()
+    return {row.to_email: row for row in await db.scalars(select(models.EmailOutbox))}
+
+async def test_batch_shares_one_connection(app, db, smtp_stub):
+    await queue(db, "a@example.com", "b@example.com", "c@example.com")
+    mailer = mailer_for(smtp_stub)
+    try:
+        assert await drain_once(mailer, RateLimiter(0), batch_size=10) == 3
+    finally:
+        mailer.close()
+    assert smtp_stub.connections == 1
+    assert sorted(m["To"] for m in smtp_stub.messages) == ["a@example.com", "b@example.com", "c@example.com"]
+    assert {row.status for row in (await outbox(db)).values()} == {models.OutboxStatus.sent}
+
+async def test_drain_claims_at_most_one_batch(app, db, smtp_stub):
+    await queue(db, *[f"user{i}@example.com" for i in range(5)])
+    mailer = mailer_for(smtp_stub)
+    try:
+        assert await drain_once(mailer, RateLimiter(0), batch_size=2) == 2
+        assert len(smtp_stub.messages) == 2
+        assert await drain_once(mailer, RateLimiter(0), batch_size=2) == 2
+        assert await drain_once(mailer, RateLimiter(0), batch_size=2) == 1
+        assert await drain_once(mailer, RateLimiter(0), batch_size=2) == 0
+    finally:
+        mailer.close()
+    assert len(smtp_stub.messages) == 5
+    assert smtp_stub.connections == 1
+
+async def test_failed_send_is_retried_with_backoff(app, db, settings, smtp_stub):
+    await queue(db, "bounce@example.com", "ok@example.com")
+    smtp_stub.reject.add("bounce@example.com")
+    mailer = mailer_for(smtp_stub)
+    before = datetime.utcnow()
+    try:
+        assert await drain_once(mailer, RateLimiter(0), batch_size=10) == 2
+        rows = await outbox(db)
+        bounced = rows["bounce@example.com"]
+        assert bounced.status == models.OutboxStatus.pending
+        assert bounced.attempts == 1
+        assert "550" in bounced.last_error
+        assert bounced.next_attempt_at >= before + timedelta(seconds=settings.EMAIL_RETRY_BASE_SECONDS)
+        assert rows["ok@example.com"].status == models.OutboxStatus.sent
+        # not due yet
+        assert await drain_once(mailer, RateLimiter(0), batch_size=10) == 0
+
+        bounced.next_attempt_at = datetime.utcnow()
+        await db.commit()
+        assert await drain_once(mailer, RateLimiter(0), batch_size=10) == 1
+        bounced = (await outbox(db))["bounce@example.com"]
+        assert bounced.attempts == 2
+        # the delay doubles per attempt
+        assert bounced.next_attempt_at >= datetime.utcnow() + timedelta(seconds=2 * settings.EMAIL_RETRY_BASE_SECONDS - 5)
+    finally:
+        mailer.close()
+
+async def test_gives_up_after_max_attempts(app, db, settings, smtp_stub):
+    await queue(db, "bounce@example.com")
+    smtp_stub.reject.add("bounce@example.com")
+    row = (await outbox(db))["bounce@example.com"]
+    row.attempts = settings.EMAIL_MAX_ATTEMPTS - 1
+    await db.commit()
+    mailer = mailer_for(smtp_stub)
+    try:
+        assert await drain_once(mailer, RateLimiter(0), batch_size=10) == 1
+        row = (await outbox(db))["bounce@example.com"]
+        assert row.status == models.OutboxStatus.failed
+        assert row.attempts == settings.EMAIL_MAX_ATTEMPTS
+        # failed rows are never claimed again
+        row.next_attempt_at = datetime.utcnow() - timedelta(minutes=1)
+        await db.commit()
+        assert await drain_once(mailer, RateLimiter(0), batch_size=10) == 0
+    finally:
+        mailer.close()
+    assert smtp_stub.messages == []
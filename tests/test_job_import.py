@@ -0,0 +1,46 @@
+import json
+import pytest
+from sqlalchemy import select
+from app import models
+from .conftest import auth_headers, make_user
+
+pytestmark = pytest.mark.anyio
+
+def ndjson(*rows):
+    return "\n".join(json.dumps(r) for r in rows).encode()
+
+async def import_rows(client, company, *rows):
+    r = await client.post("/api/jobs/import", content=ndjson(*rows), headers={**auth_headers(company), "Content-Type": "application/x-ndjson"})
+    return r.json()
+
+def job(external_id, status):
+    return {"external_id": external_id, "title": "Backend engineer", "description": "Build and run our APIs", "location": "Lagos", "status": status}
+
+async def test_reimport_follows_status_transitions(client, db):
+    company = await make_user(db, "company")
+    body = await import_rows(client, company, job("a", "Draft"), job("b", "Open"), job("c", "Closed"))
+    assert body["object"]["created"] == 3, body
+    body = await import_rows(client, company, job("a", "Open"), job("b", "Draft"), job("c", "Open"), job("b2", "Closed"))
+    results = {r["external_id"]: r for r in body["object"]["results"]}
+    assert results["a"]["action"] == "updated"
+    assert results["b"]["error"] == "invalid status transition"
+    assert results["c"]["error"] == "invalid status transition"
+    assert results["b2"]["action"] == "created"
+    statuses = dict((await db.execute(select(models.Job.external_id, models.Job.status))).all())
+    assert statuses == {"a": models.JobStatus.Open, "b": models.JobStatus.Open, "c": models.JobStatus.Closed, "b2": models.JobStatus.Closed}
+
+@pytest.fixture
+def settings(settings):
+    return settings.model_copy(update={"JOB_IMPORT_MAX_BYTES": 1000})
+
+async def test_oversized_body_is_rejected_while_reading(client, db):
+    company = await make_user(db, "company")
+    rows = ndjson(*[job(f"x{i}", "Draft") for i in range(50)])
+
+    async def chunked():
+        # no Content-Length, so only the running count can stop it
+        for i in range(0, len(rows), 100):
+            yield rows[i:i + 100]
+    r = await client.post("/api/jobs/import", content=chunked(), headers={**auth_headers(company), "Content-Type": "application/x-ndjson"})
+    assert r.status_code == 413
+    assert (await db.scalars(select(models.Job.id))).all() == []
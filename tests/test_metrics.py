@@ -0,0 +1,22 @@
+import httpx
+import pytest
+from app.main import create_app
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def settings(settings):
+    return settings.model_copy(update={"METRICS_ENABLED": True, "METRICS_TOKEN": "scrape-me"})
+
+async def test_metrics_need_the_token(client):
+    assert (await client.get("/metrics")).status_code == 401
+    assert (await client.get("/metrics", headers={"Authorization": "Bearer wrong"})).status_code == 401
+    r = await client.get("/metrics", headers={"Authorization": "Bearer scrape-me"})
+    assert r.status_code == 200
+    assert "response_cache_hits_total" in r.text
+    assert (await client.get("/cache/stats")).status_code == 404
+
+async def test_no_token_no_endpoint(settings):
+    app = create_app(settings.model_copy(update={"METRICS_TOKEN": ""}))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.get("/metrics", headers={"Authorization": "Bearer "})).status_code == 404
@@ -0,0 +1,17 @@
+import os
+import pytest
+from app.hashing import PasswordHasher
+
+pytestmark = pytest.mark.anyio
+
+async def test_dead_worker_gets_a_new_pool():
+    hasher = PasswordHasher(rounds=4, workers=1, max_pending=1)
+    try:
+        hashed = await hasher.hash("secret")
+        broken = hasher._executor
+        with pytest.raises(Exception):
+            broken.submit(os._exit, 1).result(timeout=30)
+        assert (await hasher.verify_and_update("secret", hashed))[0]
+        assert hasher._executor is not None and hasher._executor is not broken
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,68 @@
+"""Statements per request for the listing endpoints.
+
+Each budget is fixed: it must not grow with the number of rows on the page, so
+an N+1 (a lazy load per row) fails here. Each test gets a fresh app, so the first
+request also pays the one principal lookup (auth.get_current_user).
+"""
+import pytest
+from .conftest import auth_headers, make_applications, make_jobs, make_user
+
+pytestmark = pytest.mark.anyio
+
+ROWS = [1, 25]
+
+@pytest.mark.parametrize("rows", ROWS)
+async def test_my_applications_budget(client, db, statements, rows):
+    company = await make_user(db, "company")
+    applicant = await make_user(db, "applicant")
+    for job in await make_jobs(db, company, rows):
+        await make_applications(db, job, [applicant])
+    with statements:
+        r = await client.get("/api/applications/me", params={"size": 25}, headers=auth_headers(applicant))
+    assert r.status_code == 200
+    assert len(r.json()["object"]) == rows
+    # principal, count, page
+    assert statements.count == 3, statements.statements
+
+@pytest.mark.parametrize("rows", ROWS)
+async def test_view_job_applications_budget(client, db, statements, rows):
+    company = await make_user(db, "company")
+    [job] = await make_jobs(db, company, 1)
+    await make_applications(db, job, [await make_user(db, "applicant") for _ in range(rows)])
+    with statements:
+        r = await client.get(f"/api/applications/jobs/{job.id}", params={"size": 25}, headers=auth_headers(company))
+    assert r.status_code == 200
+    assert len(r.json()["object"]) == rows
+    # principal, job, count, page
+    assert statements.count == 4, statements.statements
+
+@pytest.mark.parametrize("rows", ROWS)
+async def test_browse_jobs_budget(client, db, statements, rows):
+    company = await make_user(db, "company")
+    applicant = await make_user(db, "applicant")
+    await make_jobs(db, company, rows)
+    headers = auth_headers(applicant)
+    with statements:
+        r = await client.get("/api/jobs/", params={"size": 25}, headers=headers)
+    assert r.status_code == 200
+    assert len(r.json()["object"]) == rows
+    # principal, count, page
+    assert statements.count == 3, statements.statements
+    # the rendered page is served from the response cache
+    with statements:
+        r = await client.get("/api/jobs/", params={"size": 25}, headers=headers)
+    assert r.status_code == 200
+    assert statements.count == 0, statements.statements
+
+@pytest.mark.parametrize("rows", ROWS)
+async def test_browse_jobs_with_facets_budget(client, db, statements, rows):
+    company = await make_user(db, "company")
+    applicant = await make_user(db, "applicant")
+    await make_jobs(db, company, rows)
+    with statements:
+        r = await client.get("/api/jobs/", params={"size": 25, "facets": "all", "q_location": "lag"}, headers=auth_headers(applicant))
+    assert r.status_code == 200
+    assert len(r.json()["object"]) == rows
+    assert r.json()["facets"]["location"][0]["count"] == rows
+    # principal, count, one GROUP BY for every facet, page
+    assert statements.count == 4, statements.statements
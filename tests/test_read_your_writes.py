@@ -0,0 +1,48 @@
+import shutil
+import httpx
+import pytest
+from app import db as app_db
+from app.tokens import read_write_pin
+from .conftest import auth_headers, make_jobs, make_user
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def settings(settings, tmp_path):
+    # a "replica" that never catches up: a copy of the primary taken before the write
+    return settings.model_copy(update={"DATABASE_REPLICA_URLS": f"sqlite:///{tmp_path / 'replica.db'}"})
+
+async def test_writer_never_sees_a_cached_replica_page(client, db, settings, tmp_path):
+    company = await make_user(db, "company")
+    applicant = await make_user(db, "applicant")
+    [job] = await make_jobs(db, company, 1)
+    shutil.copy(tmp_path / "test.db", tmp_path / "replica.db")
+
+    assert (await client.get("/api/jobs/", headers=auth_headers(applicant))).json()["object"][0]["title"] == "Job 0"
+    r = await client.put(f"/api/jobs/{job.id}", json={"title": "Renamed", "location": "Abuja"}, headers=auth_headers(company))
+    assert r.json()["success"], r.json()
+    # another caller reads the stale replica and refills the cache for the new generation
+    for facets in (None, "all"):
+        params = {"facets": facets} if facets else {}
+        assert (await client.get("/api/jobs/", params=params, headers=auth_headers(applicant))).json()["object"][0]["title"] == "Job 0"
+        body = (await client.get("/api/jobs/", params=params, headers=auth_headers(company))).json()
+        assert body["object"][0]["title"] == "Renamed"
+        if facets:
+            assert [f["value"] for f in body["facets"]["location"]] == ["abuja"]
+
+async def test_pin_travels_with_the_client(app, client, db, tmp_path):
+    company = await make_user(db, "company")
+    [job] = await make_jobs(db, company, 1)
+    shutil.copy(tmp_path / "test.db", tmp_path / "replica.db")
+    r = await client.put(f"/api/jobs/{job.id}", json={"title": "Renamed"}, headers=auth_headers(company))
+    assert "write_pin" in r.cookies
+    # the next read lands on a worker that never saw the write
+    app_db._writers.cache_clear()
+    assert (await client.get(f"/api/jobs/{job.id}", headers=auth_headers(company))).json()["object"]["title"] == "Renamed"
+    # a client that drops the cookie reads the replica
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as cookieless:
+        assert (await cookieless.get(f"/api/jobs/{job.id}", headers=auth_headers(company))).json()["object"]["title"] == "Job 0"
+    # a pin only pins the user it was issued to
+    other = await make_user(db, "company")
+    assert read_write_pin(r.cookies["write_pin"], str(company.id))
+    assert not read_write_pin(r.cookies["write_pin"], str(other.id))
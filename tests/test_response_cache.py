@@ -0,0 +1,23 @@
+import pytest
+from app.response_cache import SharedCache
+from app.utils import normalize_params
+from .conftest import auth_headers, make_user
+
+def test_text_filters_are_case_folded():
+    assert normalize_params({"q": " Lagos ", "page": 1}) == normalize_params({"page": 1, "q": "lagos"})
+
+def test_cursor_keeps_its_case():
+    # base64 cursors that differ only by case point at different rows
+    assert normalize_params({"cursor": "eyJ0IjoiMjAyNi0wMS0wMSJ9"}) != normalize_params({"cursor": "EYJ0IJOIMJAYNI0WMS0WMSJ9"})
+
+def test_shared_cache_is_abstract():
+    with pytest.raises(TypeError):
+        SharedCache()
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("param, good, bad", [("facets", "location", "LOCATION"), ("count", "exact", "EXACT")])
+async def test_validated_params_dont_share_cache_entries(client, db, param, good, bad):
+    headers = auth_headers(await make_user(db, "applicant"))
+    assert (await client.get("/api/jobs/", params={param: good}, headers=headers)).status_code == 200
+    # the answer for an invalid spelling doesn't depend on what is cached
+    assert (await client.get("/api/jobs/", params={param: bad}, headers=headers)).status_code == 400